@@ -1,10 +1,14 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from typing import Optional
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from app.core.config import settings
 from app.core.database import get_database
+from app.core.shared_state import shared_state
+import time
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_database)):
     credentials_exception = HTTPException(
@@ -23,4 +27,39 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get
     user = await db.users.find_one({"email": email})
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+async def get_admin_user(user = Depends(get_current_user)):
+    if user["email"] not in settings.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
+
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme), db = Depends(get_database)):
+    """Like get_current_user, but returns None for anonymous requests instead of failing."""
+    if not token:
+        return None
+    try:
+        return await get_current_user(token, db)
+    except HTTPException:
+        return None
+
+async def get_llm_user_key(request: Request, user = Depends(get_optional_user)) -> str:
+    """
+    Identity used for fair queuing of LLM work: the user id, or the client
+    address when anonymous. Also enforces LLM_USER_RATE_LIMIT_PER_MINUTE.
+    """
+    if user is not None:
+        key = f"user:{user['_id']}"
+    else:
+        key = f"ip:{request.client.host if request.client else 'unknown'}"
+
+    if settings.LLM_USER_RATE_LIMIT_PER_MINUTE > 0:
+        window = int(time.time() // 60)
+        count = await shared_state.incr(f"llm-rate:{key}:{window}", ttl=120)
+        if count > settings.LLM_USER_RATE_LIMIT_PER_MINUTE:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many AI requests, please wait a minute and try again.",
+                headers={"Retry-After": str(60 - int(time.time()) % 60)},
+            )
+    return key
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.api.dependencies import get_admin_user
+from app.core.profiling import list_profiles, get_profile
+from app.core.shared_state import WORKER_ID
+
+router = APIRouter(dependencies=[Depends(get_admin_user)])
+
+@router.get("/profiles")
+async def get_profiles():
+    """List request profiles captured by the worker serving this request, newest first."""
+    return list_profiles()
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def download_profile(profile_id: str):
+    """Download a profile as collapsed stacks (flamegraph.pl / speedscope format)."""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found on worker {WORKER_ID}")
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id.replace(":", "-")}.folded"'}
+    )
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+import hashlib
 from typing import List
-from app.models.analysis import SyllabusAnalysis, SyllabusAnalysisCreate
+from app.models.analysis import (
+    SyllabusAnalysis, SyllabusAnalysisCreate, ProgressSummary, TopicProgressUpdate,
+    AnalysisVersionInfo, AnalysisVersion, AnalysisVersionDiff
+)
 from app.core.database import get_database
 from datetime import datetime
 from bson import ObjectId
 from app.api.dependencies import get_current_user
 from app.services.scheduler import generate_study_schedule
+from app.services.progress import ensure_topic_ids, compute_progress, find_topic_chain, plan_completion_update
+from app.services import version_store
+from app.utils.json_patch import make_patch
+from app.utils.calendar_export import FULL_EXPORT_PROJECTION, export_projection, projection_truncated, stream_ics, stream_csv
 from app.models.syllabus import Topic
 from pydantic import BaseModel
 from typing import Optional
@@ -17,6 +27,18 @@ class ScheduleRequest(BaseModel):
 
 router = APIRouter()
 
+# Number of times a progress update is retried when another writer got there first
+PROGRESS_UPDATE_RETRIES = 5
+
+def _revision_filter(progress: Optional[dict]) -> dict:
+    """Optimistic concurrency guard on the progress revision counter."""
+    if progress is None:
+        return {"progress": {"$exists": False}}
+    return {"progress.revision": progress.get("revision", 0)}
+
+def _next_revision(progress: Optional[dict]) -> int:
+    return (progress or {}).get("revision", 0) + 1
+
 @router.post("/", response_model=SyllabusAnalysis)
 async def save_analysis(
     analysis: SyllabusAnalysisCreate, 
@@ -26,8 +48,11 @@ async def save_analysis(
     new_analysis = analysis.model_dump()
     new_analysis["created_at"] = datetime.utcnow()
     new_analysis["user_id"] = current_user["_id"]
+    topics = ensure_topic_ids(new_analysis["analysis_result"].get("topics") or [])
+    new_analysis["progress"] = compute_progress(topics)
     
     result = await db.analyses.insert_one(new_analysis)
+    await version_store.record_version(db, result.inserted_id, 1, new_analysis["analysis_result"])
     created_analysis = await db.analyses.find_one({"_id": result.inserted_id})
     return created_analysis
 
@@ -71,6 +96,7 @@ async def delete_analysis(
     })
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Analysis not found")
+    await version_store.delete_versions(db, ObjectId(id))
     return {"message": "Analysis deleted successfully"}
 
 @router.put("/{id}", response_model=SyllabusAnalysis)
@@ -85,13 +111,34 @@ async def update_analysis(
     
     # Update the analysis
     update_data = analysis.model_dump()
-    result = await db.analyses.update_one(
-        {"_id": ObjectId(id), "user_id": current_user["_id"]},
-        {"$set": update_data}
-    )
-    
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Analysis not found")
+    topics = ensure_topic_ids(update_data["analysis_result"].get("topics") or [])
+    query = {"_id": ObjectId(id), "user_id": current_user["_id"]}
+    for _ in range(PROGRESS_UPDATE_RETRIES):
+        existing = await db.analyses.find_one(
+            query, {"progress.revision": 1, "version": 1, "analysis_result": 1}
+        )
+        if not existing:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+
+        # Bump the revision so in-flight topic updates based on the old tree are rejected
+        update_data["progress"] = compute_progress(topics, _next_revision(existing.get("progress")))
+        # Checkbox-only saves change progress, not content: no new version
+        # (compared as JSON, since the client echoes stored datetimes back as strings)
+        content_changed = (
+            jsonable_encoder(version_store.content_only(existing.get("analysis_result") or {}))
+            != jsonable_encoder(version_store.content_only(update_data["analysis_result"]))
+        )
+        update_data["version"] = existing.get("version", 1) + (1 if content_changed else 0)
+        result = await db.analyses.update_one(
+            {**query, **_revision_filter(existing.get("progress"))},
+            {"$set": update_data}
+        )
+        if result.matched_count == 1:
+            if content_changed:
+                await version_store.record_update(db, existing, update_data["analysis_result"])
+            break
+    else:
+        raise HTTPException(status_code=409, detail="Analysis is being modified concurrently, please retry")
     
     # Return updated document
     updated_analysis = await db.analyses.find_one({"_id": ObjectId(id)})
@@ -137,17 +184,227 @@ async def generate_schedule(
     )
     
     # Update analysis result
-    updated_result = analysis["analysis_result"]
+    updated_result = dict(analysis["analysis_result"])
     updated_result["topics"] = [t.model_dump() for t in scheduled_topics]
     updated_result["projected_completion_date"] = completion_date
     updated_result["schedule_params"] = request.model_dump() # Save params used
     
     # Save to DB
-    await db.analyses.update_one(
-        {"_id": ObjectId(id)}, 
-        {"$set": {"analysis_result": updated_result}}
+    progress = compute_progress(
+        ensure_topic_ids(updated_result["topics"]),
+        _next_revision(analysis.get("progress"))
+    )
+    result = await db.analyses.update_one(
+        {"_id": ObjectId(id), **_revision_filter(analysis.get("progress"))}, 
+        {"$set": {"analysis_result": updated_result, "progress": progress, "version": analysis.get("version", 1) + 1}}
     )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Analysis was modified while scheduling, please retry")
+    analysis["version"] = await version_store.record_update(db, analysis, updated_result)
     
     # Return updated document
     analysis["analysis_result"] = updated_result
+    analysis["progress"] = progress
     return analysis
+
+
+@router.get("/{id}/progress", response_model=ProgressSummary)
+async def get_progress(
+    id: str,
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Returns the stored progress counters without loading the topic tree."""
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    analysis = await db.analyses.find_one(
+        {"_id": ObjectId(id), "user_id": current_user["_id"]},
+        {"progress": 1}
+    )
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    if analysis.get("progress") is None:
+        # Legacy document saved before counters existed; compute once and store.
+        full = await db.analyses.find_one({"_id": ObjectId(id)}, {"analysis_result.topics": 1})
+        topics = (full.get("analysis_result") or {}).get("topics") or []
+        progress = compute_progress(topics, 1)
+        await db.analyses.update_one(
+            {"_id": ObjectId(id), "progress": {"$exists": False}},
+            {"$set": {"progress": progress}}
+        )
+        return progress
+    return analysis["progress"]
+
+
+@router.patch("/{id}/topics/{topic_ref}", response_model=ProgressSummary)
+async def update_topic_progress(
+    id: str,
+    topic_ref: str,
+    update: TopicProgressUpdate,
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """
+    Marks a single topic (addressed by its id or a dotted index path like "0.2.1")
+    as completed or not. The change cascades to subtopics and parents exactly like
+    the checkbox in the UI, and the progress counters are updated in the same write.
+    """
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    query = {"_id": ObjectId(id), "user_id": current_user["_id"]}
+    for _ in range(PROGRESS_UPDATE_RETRIES):
+        analysis = await db.analyses.find_one(query, {"analysis_result.topics": 1, "progress": 1})
+        if not analysis:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+
+        topics = (analysis.get("analysis_result") or {}).get("topics") or []
+        stored_progress = analysis.get("progress")
+        guard = _revision_filter(stored_progress)
+
+        if stored_progress is None or _missing_topic_ids(topics):
+            # Backfill ids and counters for documents saved before they existed.
+            ensure_topic_ids(topics)
+            backfilled = compute_progress(topics, _next_revision(stored_progress))
+            result = await db.analyses.update_one(
+                {**query, **guard},
+                {"$set": {"analysis_result.topics": topics, "progress": backfilled}}
+            )
+            if result.matched_count == 0:
+                continue
+            stored_progress, guard = backfilled, _revision_filter(backfilled)
+
+        chain = find_topic_chain(topics, topic_ref)
+        if chain is None:
+            raise HTTPException(status_code=404, detail="Topic not found")
+
+        updates, array_filters, progress = plan_completion_update(
+            topics, chain, update.completed, stored_progress
+        )
+        if not updates:
+            return stored_progress
+
+        result = await db.analyses.update_one(
+            {**query, **guard},
+            {"$set": {**updates, "progress": progress}},
+            array_filters=array_filters
+        )
+        if result.matched_count == 1:
+            return progress
+
+    raise HTTPException(status_code=409, detail="Analysis is being modified concurrently, please retry")
+
+
+def _missing_topic_ids(topics: List[dict]) -> bool:
+    return any(not t.get("id") or _missing_topic_ids(t.get("subtopics") or []) for t in topics)
+
+
+async def _get_owned_analysis_id(db, id: str, current_user) -> ObjectId:
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+    analysis = await db.analyses.find_one(
+        {"_id": ObjectId(id), "user_id": current_user["_id"]},
+        {"_id": 1}
+    )
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return analysis["_id"]
+
+
+@router.get("/{id}/versions", response_model=List[AnalysisVersionInfo])
+async def list_analysis_versions(
+    id: str,
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Lists the stored versions of an analysis, newest first."""
+    analysis_id = await _get_owned_analysis_id(db, id, current_user)
+    return await version_store.list_versions(db, analysis_id)
+
+
+@router.get("/{id}/versions/{version}", response_model=AnalysisVersion)
+async def get_analysis_version(
+    id: str,
+    version: int,
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """
+    Rebuilds the analysis content as it was at `version`. Completion flags and
+    topic ids are progress state and not part of versions; see /progress.
+    """
+    analysis_id = await _get_owned_analysis_id(db, id, current_user)
+    stored = await version_store.get_version(db, analysis_id, version)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return stored
+
+
+@router.get("/{id}/diff", response_model=AnalysisVersionDiff)
+async def diff_analysis_versions(
+    id: str,
+    from_version: int,
+    to_version: int,
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Returns the JSON patch that turns `from_version` into `to_version`."""
+    analysis_id = await _get_owned_analysis_id(db, id, current_user)
+    old = await version_store.get_version(db, analysis_id, from_version)
+    new = await version_store.get_version(db, analysis_id, to_version)
+    if old is None or new is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return {
+        "from_version": from_version,
+        "to_version": to_version,
+        "patch": make_patch(old["analysis_result"], new["analysis_result"])
+    }
+
+
+EXPORT_FORMATS = {
+    "ics": ("text/calendar; charset=utf-8", stream_ics),
+    "csv": ("text/csv; charset=utf-8", stream_csv),
+}
+
+@router.get("/{id}/export.{fmt}")
+async def export_schedule(
+    id: str,
+    fmt: str,
+    date_from: Optional[str] = Query(None, alias="from", pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    date_to: Optional[str] = Query(None, alias="to", pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    if_none_match: Optional[str] = Header(None),
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """
+    Stream the scheduled topics as an iCalendar feed (`export.ics`) or CSV
+    (`export.csv`), optionally limited to a `from`/`to` date range. Responses
+    carry an ETag derived from the analysis version and progress revision, so
+    calendar apps polling with If-None-Match get a 304 without the tree being loaded.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail="Unsupported export format")
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    query = {"_id": ObjectId(id), "user_id": current_user["_id"]}
+    stamp = await db.analyses.find_one(query, {"version": 1, "progress.revision": 1})
+    if not stamp:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    key = f"{id}:{stamp.get('version', 1)}:{(stamp.get('progress') or {}).get('revision', 0)}:{fmt}:{date_from}:{date_to}"
+    etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    analysis = await db.analyses.find_one(query, export_projection())
+    if analysis and projection_truncated(analysis):
+        analysis = await db.analyses.find_one(query, FULL_EXPORT_PROJECTION)
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    media_type, stream = EXPORT_FORMATS[fmt]
+    headers["Content-Disposition"] = f'attachment; filename="study-plan-{id}.{fmt}"'
+    return StreamingResponse(stream(analysis, date_from, date_to), media_type=media_type, headers=headers)
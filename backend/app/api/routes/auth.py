@@ -4,6 +4,7 @@ from app.models.user import UserCreate, UserInDB, UserOut
 from app.core.database import get_database
 from app.core.auth_utils import get_password_hash, verify_password, create_access_token
 from datetime import datetime
+import asyncio
 
 router = APIRouter()
 
@@ -20,7 +21,8 @@ async def signup(user: UserCreate, db = Depends(get_database)):
     # Create new user
     user_in_db = UserInDB(
         email=user.email,
-        hashed_password=get_password_hash(user.password),
+        # bcrypt is CPU-bound; run it off the event loop
+        hashed_password=await asyncio.to_thread(get_password_hash, user.password),
         created_at=datetime.utcnow()
     )
     
@@ -31,7 +33,7 @@ async def signup(user: UserCreate, db = Depends(get_database)):
 @router.post("/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_database)):
     user = await db.users.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await asyncio.to_thread(verify_password, form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional
 from app.services.ollama_service import generate_quiz, chat_with_context
+from app.api.dependencies import get_llm_user_key
 
 router = APIRouter()
 
@@ -15,25 +16,25 @@ class ChatRequest(BaseModel):
     user_query: str
 
 @router.post("/quiz")
-async def create_quiz(request: QuizRequest):
+async def create_quiz(request: QuizRequest, user_key: str = Depends(get_llm_user_key)):
     """Generate a quiz for a topic."""
     try:
         if not request.topic_name:
              raise HTTPException(status_code=400, detail="Topic name is required")
         
-        quiz = await generate_quiz(request.topic_name, request.topic_context, request.difficulty)
+        quiz = await generate_quiz(request.topic_name, request.topic_context, request.difficulty, user_key)
         return quiz
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/chat")
-async def chat_topic(request: ChatRequest):
+async def chat_topic(request: ChatRequest, user_key: str = Depends(get_llm_user_key)):
     """Chat with context about a topic."""
     try:
         if not request.user_query:
             raise HTTPException(status_code=400, detail="Query is required")
             
-        response = await chat_with_context(request.user_query, request.topic_context)
+        response = await chat_with_context(request.user_query, request.topic_context, user_key)
         return {"response": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,174 @@
+from fastapi import APIRouter, HTTPException, Depends
+from typing import List, Dict, Any
+from datetime import datetime
+from bson import ObjectId
+from app.core.database import get_database
+from app.api.dependencies import get_current_user
+from app.models.plan import StudyPlanCreate, StudyPlan, StudyPlanSummary
+from app.utils.study_plan_generator import flatten_course_leaves, generate_combined_plan
+
+router = APIRouter()
+
+# Fields needed to (re)build one course of a plan
+COURSE_PROJECTION = {
+    "filename": 1,
+    "version": 1,
+    "progress.revision": 1,
+    "analysis_result.course_name": 1,
+    "analysis_result.topics": 1,
+}
+
+def _stamp(analysis: Dict[str, Any]) -> List[int]:
+    """Changes whenever the analysis topics or their completion state change."""
+    return [analysis.get("version", 1), (analysis.get("progress") or {}).get("revision", 0)]
+
+def _course_cache_entry(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    result = analysis.get("analysis_result") or {}
+    return {
+        "stamp": _stamp(analysis),
+        "course_name": result.get("course_name") or analysis.get("filename") or "Course",
+        "leaves": flatten_course_leaves(result.get("topics") or []),
+    }
+
+def _build(plan: Dict[str, Any], start_date: datetime) -> Dict[str, Any]:
+    """Plans every cached course from `start_date`; returns the fields to store."""
+    courses = [
+        {
+            "analysis_id": analysis_id,
+            "course_name": cached["course_name"],
+            "leaves": cached["leaves"],
+            "exam_date": plan.get("exam_dates", {}).get(analysis_id),
+        }
+        for analysis_id, cached in plan["course_cache"].items()
+    ]
+    try:
+        items, summaries, completion_date = generate_combined_plan(
+            courses, start_date, plan["daily_hours"], plan["days_off"]
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return {
+        "items": items,
+        "courses": summaries,
+        "projected_completion_date": completion_date,
+        "updated_at": datetime.utcnow(),
+    }
+
+@router.post("/", response_model=StudyPlan)
+async def create_plan(
+    request: StudyPlanCreate,
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Merge several saved analyses into one study calendar with a shared daily budget."""
+    if not request.analysis_ids:
+        raise HTTPException(status_code=400, detail="At least one analysis is required.")
+    if not all(ObjectId.is_valid(a) for a in request.analysis_ids):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    ids = list(dict.fromkeys(request.analysis_ids))
+    analyses = await db.analyses.find(
+        {"_id": {"$in": [ObjectId(a) for a in ids]}, "user_id": current_user["_id"]},
+        COURSE_PROJECTION
+    ).to_list(None)
+    by_id = {str(a["_id"]): a for a in analyses}
+    missing = [a for a in ids if a not in by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Analyses not found: {', '.join(missing)}")
+
+    plan = {
+        "user_id": current_user["_id"],
+        "analysis_ids": ids,
+        "start_date": request.start_date,
+        "daily_hours": request.daily_hours,
+        "days_off": request.days_off,
+        "exam_dates": {k: v for k, v in request.exam_dates.items() if k in by_id},
+        "course_cache": {a: _course_cache_entry(by_id[a]) for a in ids},
+        "created_at": datetime.utcnow(),
+    }
+    plan.update(_build(plan, request.start_date))
+
+    result = await db.study_plans.insert_one(plan)
+    plan["_id"] = result.inserted_id
+    return plan
+
+@router.get("/", response_model=List[StudyPlanSummary])
+async def list_plans(
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    return await db.study_plans.find(
+        {"user_id": current_user["_id"]},
+        {"items": 0, "course_cache": 0, "courses": 0}
+    ).sort("created_at", -1).to_list(100)
+
+@router.get("/{id}", response_model=StudyPlan)
+async def get_plan(
+    id: str,
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """
+    Returns the plan, first bringing it up to date if any of its courses changed.
+    Only changed courses are re-read, and only topics not yet behind us are
+    re-planned; past days are kept as they were.
+    """
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    plan = await db.study_plans.find_one({"_id": ObjectId(id), "user_id": current_user["_id"]})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Study plan not found")
+
+    cache = plan["course_cache"]
+    stamps = await db.analyses.find(
+        {"_id": {"$in": [ObjectId(a) for a in cache]}, "user_id": current_user["_id"]},
+        {"version": 1, "progress.revision": 1}
+    ).to_list(None)
+    current = {str(a["_id"]): _stamp(a) for a in stamps}
+    changed = [a for a, stamp in current.items() if cache[a]["stamp"] != stamp]
+    removed = [a for a in cache if a not in current]
+    if not changed and not removed:
+        return plan
+
+    for analysis_id in removed:
+        del cache[analysis_id]
+    if changed:
+        fresh = await db.analyses.find(
+            {"_id": {"$in": [ObjectId(a) for a in changed]}},
+            COURSE_PROJECTION
+        ).to_list(None)
+        for analysis in fresh:
+            cache[str(analysis["_id"])] = _course_cache_entry(analysis)
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = max(plan["start_date"], today)
+    unfinished = {leaf["topic_id"] for cached in cache.values() for leaf in cached["leaves"]}
+    history = [
+        item for item in plan.get("items", [])
+        if item["scheduled_date"] < start.strftime("%Y-%m-%d")
+        and item["analysis_id"] in cache
+        and item["topic_id"] not in unfinished
+    ]
+
+    update = _build(plan, start)
+    update["items"] = history + update["items"]
+    update["course_cache"] = cache
+    update["analysis_ids"] = [a for a in plan["analysis_ids"] if a in cache]
+    await db.study_plans.update_one({"_id": plan["_id"]}, {"$set": update})
+    plan.update(update)
+    return plan
+
+@router.delete("/{id}")
+async def delete_plan(
+    id: str,
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    result = await db.study_plans.delete_one({"_id": ObjectId(id), "user_id": current_user["_id"]})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Study plan not found")
+    return {"message": "Study plan deleted successfully"}
@@ -1,10 +1,17 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
+from typing import List
 from app.services.ollama_service import analyze_syllabus
+from app.services.bulk_upload import BulkEntry, is_zip_upload, iter_zip_entries, process_bulk
 from app.utils.file_processing import extract_text_from_file
 from app.models.syllabus import SyllabusAnalysisResponse
+from app.api.dependencies import get_llm_user_key
+import asyncio
+import itertools
 import logging
 import os
+import shutil
+import tempfile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,6 +37,7 @@ async def get_upload_page():
 @router.post("/upload", response_model=SyllabusAnalysisResponse)
 async def upload_and_analyze_syllabus(
     file: UploadFile = File(..., description="Syllabus file (PDF, DOCX, TXT)"),
+    user_key: str = Depends(get_llm_user_key),
 ):
     """
     Upload a syllabus document (PDF, DOCX, TXT), extract text,
@@ -68,7 +76,7 @@ async def upload_and_analyze_syllabus(
 
         # Analyze syllabus using local Ollama service
         logger.info("Analyzing syllabus with Ollama...")
-        analysis_result = await analyze_syllabus(text_content)
+        analysis_result = await analyze_syllabus(text_content, user_key)
         logger.info("Analysis complete.")
 
         # Calculate hash for versioning
@@ -94,4 +102,67 @@ async def upload_and_analyze_syllabus(
                 "detail": "An unexpected error occurred processing the syllabus. Please try again or contact support if the issue persists.",
                 "error": str(e)
             }
-        )
\ No newline at end of file
+        )
+
+def _spool(source):
+    """Copies an upload into a temporary file we own."""
+    tmp = tempfile.TemporaryFile()
+    shutil.copyfileobj(source, tmp)
+    tmp.seek(0)
+    return tmp
+
+@router.post("/upload/bulk")
+async def bulk_upload_and_analyze(
+    files: List[UploadFile] = File(..., description="Syllabus files (PDF, DOCX, TXT) and/or ZIP archives of them"),
+    user_key: str = Depends(get_llm_user_key),
+):
+    """
+    Analyze many syllabi in one request. Accepts several files and/or ZIP archives,
+    skips duplicate documents and analyzes the rest with bounded parallelism.
+    Results are streamed back as NDJSON, one line per file in completion order,
+    followed by a summary line.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded.")
+
+    # Upload files are closed once the handler returns, before the body is
+    # streamed, so spool them to our own temporary files first.
+    # Copying (and reading ZIP directories) is blocking I/O, so it runs in a thread.
+    spooled = []
+    sources = []
+    for upload in files:
+        tmp = await asyncio.to_thread(_spool, upload.file)
+        spooled.append(tmp)
+
+        if is_zip_upload(upload.filename, upload.content_type):
+            try:
+                sources.append(await asyncio.to_thread(iter_zip_entries, tmp))
+            except Exception:
+                # Reported as an error line for this archive; the rest of the batch still runs
+                sources.append([BulkEntry(
+                    filename=upload.filename,
+                    content_type=upload.content_type,
+                    size=0,
+                    read=lambda: b"",
+                    error="Not a valid ZIP archive.",
+                )])
+        else:
+            size = tmp.seek(0, os.SEEK_END)
+            sources.append([BulkEntry(
+                filename=upload.filename,
+                content_type=upload.content_type,
+                size=size,
+                read=lambda tmp=tmp: (tmp.seek(0), tmp.read())[1],
+            )])
+
+    logger.info(f"Bulk upload received {len(files)} file(s).")
+
+    async def stream():
+        try:
+            async for line in process_bulk(itertools.chain.from_iterable(sources), user_key):
+                yield line
+        finally:
+            for f in spooled:
+                f.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from app.core.database import get_database
+from app.api.dependencies import get_current_user
+from app.models.syllabus import CatalogTopic
+from app.services.topic_catalog import search_topics
+
+router = APIRouter()
+
+@router.get("/autocomplete", response_model=List[CatalogTopic])
+async def autocomplete_topics(
+    q: str = Query(..., min_length=1, description="Partial topic name"),
+    limit: int = Query(10, ge=1, le=50),
+    db = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Suggest known topics from the catalog, with their typical study hours."""
+    return await search_topics(db, q, limit)
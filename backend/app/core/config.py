@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
+from typing import List
 import os
 
 load_dotenv() # Load environment variables from .env file
@@ -20,6 +21,44 @@ class Settings(BaseSettings):
 
     SECRET_KEY: str = "your-secret-key-change-me" # Should be in .env
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7 # 7 days
+    ADMIN_EMAILS: List[str] = [] # JSON list in .env, e.g. ["ops@example.com"]
+
+    # Request profiling (see app/core/profiling.py)
+    PROFILING_SAMPLE_RATE: float = 0.0 # Fraction of requests profiled at random
+    PROFILING_SLOW_MS: int = 0 # Keep profiles of requests slower than this; 0 disables
+    PROFILING_ARM_MS: int = 500 # Start sampling a request once it has run this long
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_BUFFER_SIZE: int = 50
+
+    # LLM request scheduling (per worker process)
+    OLLAMA_MAX_CONCURRENCY: int = 2 # Requests sent to Ollama at the same time
+    LLM_USER_MAX_IN_FLIGHT: int = 1 # Of those, how many a single user may hold per priority class
+    LLM_USER_RATE_LIMIT_PER_MINUTE: int = 0 # LLM requests per user per minute across all workers; 0 disables
+
+    # Serving (see uvicorn_config.py)
+    WEB_CONCURRENCY: int = 0 # Worker processes in production; 0 means one per CPU core
+    GRACEFUL_SHUTDOWN_SECONDS: int = 130 # Longer than the 120s Ollama timeout so in-flight calls can finish
+    SHARED_STATE_BACKEND: str = "memory" # "memory" (single worker) or "mongo" (shared by all workers)
+
+    # Outline pre-parser: confidence needed to skip the LLM entirely, or to
+    # send the parsed outline instead of the full syllabus text
+    OUTLINE_SKIP_LLM_CONFIDENCE: float = 0.8
+    OUTLINE_PROMPT_CONFIDENCE: float = 0.5
+
+    # Topic catalog built from saved analyses
+    TOPIC_CATALOG_REFRESH_SECONDS: int = 600
+    TOPIC_CATALOG_MIN_SAMPLES: int = 5 # Hour samples needed before the catalog is trusted
+    TOPIC_CATALOG_OUTLIER_FACTOR: float = 3.0 # Estimates this many times off the median are replaced
+
+    # PDF extraction
+    PDF_PAGE_CACHE_SIZE: int = 5000 # Pages whose extracted text is kept in memory
+    PDF_PROBE_PAGES: int = 3 # Pages checked for a text layer before the full pass
+    PDF_OCR_ENABLED: bool = False # Needs pdf2image (poppler) and pytesseract installed
+
+    # Bulk syllabus upload
+    BULK_UPLOAD_CONCURRENCY: int = 3 # Files analyzed in parallel
+    BULK_UPLOAD_MAX_FILES: int = 100
+    BULK_UPLOAD_MAX_FILE_BYTES: int = 20 * 1024 * 1024 # Per file / archive entry, uncompressed
 
     # Add other settings as needed
 
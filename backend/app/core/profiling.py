@@ -0,0 +1,182 @@
+import asyncio
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+import jwt
+from .config import settings
+from .shared_state import WORKER_ID
+
+# Opt-in sampling profiler for API requests.
+#
+# A single background thread takes a snapshot of every thread's Python stack
+# every PROFILING_INTERVAL_MS while at least one profiled request is active,
+# and adds the folded stacks to each active profile. A request is profiled when
+#   - an admin sends the "X-Profile: 1" header,
+#   - it is picked by PROFILING_SAMPLE_RATE, or
+#   - it is still running after PROFILING_ARM_MS; it is then kept only if it
+#     ends up slower than PROFILING_SLOW_MS.
+# Finished profiles go to a bounded ring buffer and can be downloaded in the
+# collapsed-stack format understood by flamegraph.pl and speedscope.
+#
+# Stacks of all threads are sampled, so work of concurrent requests running
+# at the same time shows up in each other's profiles.
+#
+# Profiles live in the memory of the worker process that served the request.
+# Ids start with the worker id, so with several workers a download that lands
+# on another worker gets a clear 404 instead of someone else's profile.
+
+MAX_STACK_DEPTH = 128
+
+@dataclass
+class Profile:
+    id: str
+    method: str
+    path: str
+    reason: str
+    started_at: datetime
+    status_code: Optional[int] = None
+    duration_ms: Optional[float] = None
+    sample_count: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "worker": WORKER_ID,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "status_code": self.status_code,
+            "duration_ms": self.duration_ms,
+            "sample_count": self.sample_count,
+        }
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+class _Sampler:
+    def __init__(self):
+        self._active: Dict[int, Profile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile):
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile):
+        with self._lock:
+            self._active.pop(profile.id, None)
+
+    def _run(self):
+        interval = settings.PROFILING_INTERVAL_MS / 1000.0
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                stacks.append(";".join(reversed(labels)))
+
+            # Under the lock so a profile is never touched after stop() returns
+            with self._lock:
+                for profile in self._active.values():
+                    profile.stacks.update(stacks)
+                    profile.sample_count += 1
+            time.sleep(interval)
+
+_sampler = _Sampler()
+_profile_ids = itertools.count(1)
+profiles: deque = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+
+def get_profile(profile_id: str) -> Optional[Profile]:
+    return next((p for p in profiles if p.id == profile_id), None)
+
+def list_profiles() -> List[dict]:
+    return [p.summary() for p in reversed(profiles)]
+
+def _is_admin_request(headers: Dict[bytes, bytes]) -> bool:
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    if not auth.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(auth[7:], settings.SECRET_KEY, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        return False
+    return payload.get("sub") in settings.ADMIN_EMAILS
+
+class ProfilingMiddleware:
+    """ASGI middleware deciding which requests are profiled; see the module comment."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        reason = None
+        if headers.get(b"x-profile") == b"1" and _is_admin_request(headers):
+            reason = "header"
+        elif settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            reason = "sampled"
+        if not reason and settings.PROFILING_SLOW_MS <= 0:
+            return await self.app(scope, receive, send)
+
+        profile = Profile(
+            id=f"{WORKER_ID}-{next(_profile_ids)}",
+            method=scope.get("method", ""),
+            path=scope.get("path", ""),
+            reason=reason or "slow",
+            started_at=datetime.utcnow(),
+        )
+        arm_handle = None
+        if reason:
+            _sampler.start(profile)
+        else:
+            arm_handle = asyncio.get_running_loop().call_later(
+                settings.PROFILING_ARM_MS / 1000.0, _sampler.start, profile
+            )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if arm_handle is not None:
+                arm_handle.cancel()
+            _sampler.stop(profile)
+            profile.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            if reason or (profile.sample_count and profile.duration_ms >= settings.PROFILING_SLOW_MS):
+                profiles.append(profile)
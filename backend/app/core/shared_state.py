@@ -0,0 +1,160 @@
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from .config import settings
+from .database import get_database
+
+# Small key/value store for state that must agree across worker processes:
+# counters for rate limits and leases that elect one worker for background jobs.
+# "memory" keeps everything in the current process (fine for a single worker);
+# "mongo" stores it in the shared_state collection so every worker sees it.
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class InProcessState:
+    # Seconds between sweeps of expired keys (rate-limit keys change every minute)
+    SWEEP_INTERVAL = 60.0
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+
+    def _sweep(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.SWEEP_INTERVAL
+        expired = [key for key, (_, expires) in self._data.items() if expires is not None and expires <= now]
+        for key in expired:
+            del self._data[key]
+
+    def _live(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl else None
+
+    async def get(self, key: str) -> Any:
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._sweep()
+        self._data[key] = (value, self._expiry(ttl))
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Increments a counter; `ttl` only applies when the counter is (re)created."""
+        self._sweep()
+        entry = self._live(key)
+        if entry is None:
+            self._data[key] = (amount, self._expiry(ttl))
+            return amount
+        self._data[key] = (entry[0] + amount, entry[1])
+        return entry[0] + amount
+
+    async def acquire_lease(self, name: str, ttl: float, owner: str = WORKER_ID) -> bool:
+        """Takes (or renews) a named lease unless another owner holds an unexpired one."""
+        self._sweep()
+        key = f"lease:{name}"
+        entry = self._live(key)
+        if entry is not None and entry[0] != owner:
+            return False
+        self._data[key] = (owner, self._expiry(ttl))
+        return True
+
+class MongoState:
+    """Same interface as InProcessState, backed by a collection with a TTL index."""
+
+    @property
+    def _collection(self):
+        return get_database().shared_state
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[datetime]:
+        return datetime.utcnow() + timedelta(seconds=ttl) if ttl else None
+
+    def _not_expired(self) -> dict:
+        return {"$or": [{"expires_at": None}, {"expires_at": {"$gt": datetime.utcnow()}}]}
+
+    async def get(self, key: str) -> Any:
+        doc = await self._collection.find_one({"_id": key, **self._not_expired()})
+        return doc["value"] if doc else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": self._expiry(ttl)}},
+            upsert=True
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._collection.delete_one({"_id": key})
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        for _ in range(3):
+            doc = await self._collection.find_one_and_update(
+                {"_id": key, **self._not_expired()},
+                {"$inc": {"value": amount}},
+                return_document=ReturnDocument.AFTER
+            )
+            if doc:
+                return doc["value"]
+            # Missing or expired (the TTL monitor only runs once a minute): restart it
+            result = await self._collection.update_one(
+                {"_id": key, "expires_at": {"$lte": datetime.utcnow()}},
+                {"$set": {"value": amount, "expires_at": self._expiry(ttl)}}
+            )
+            if result.modified_count:
+                return amount
+            try:
+                await self._collection.insert_one({"_id": key, "value": amount, "expires_at": self._expiry(ttl)})
+                return amount
+            except DuplicateKeyError:
+                continue # Another worker created it first
+        raise RuntimeError(f"Could not increment shared counter {key}")
+
+    async def acquire_lease(self, name: str, ttl: float, owner: str = WORKER_ID) -> bool:
+        try:
+            await self._collection.update_one(
+                {
+                    "_id": f"lease:{name}",
+                    "$or": [{"value": owner}, {"expires_at": {"$lte": datetime.utcnow()}}],
+                },
+                {"$set": {"value": owner, "expires_at": self._expiry(ttl)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False # Held by another worker
+
+async def ensure_shared_state_indexes() -> None:
+    if isinstance(shared_state, MongoState):
+        await get_database().shared_state.create_index("expires_at", expireAfterSeconds=0)
+
+def _create_shared_state():
+    if settings.SHARED_STATE_BACKEND == "mongo":
+        return MongoState()
+    if settings.SHARED_STATE_BACKEND != "memory":
+        raise ValueError(f"Unknown SHARED_STATE_BACKEND: {settings.SHARED_STATE_BACKEND}")
+    if settings.WEB_CONCURRENCY > 1:
+        # Each worker would hold its own leases and counters: every worker would
+        # refresh the topic catalog and rate limits would multiply.
+        raise RuntimeError(
+            f"SHARED_STATE_BACKEND=memory cannot be used with WEB_CONCURRENCY={settings.WEB_CONCURRENCY}; "
+            "set SHARED_STATE_BACKEND=mongo."
+        )
+    return InProcessState()
+
+shared_state = _create_shared_state()
@@ -3,10 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware import Middleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 
 # Import routers
 from .api.routes import syllabus
-from .core.database import connect_to_mongo, close_mongo_connection
+from .core.profiling import ProfilingMiddleware
+from .core.database import connect_to_mongo, close_mongo_connection, get_database
+from .core.shared_state import ensure_shared_state_indexes
+from .services.version_store import ensure_version_indexes
+from .services.llm_scheduler import llm_scheduler
+from .services.topic_catalog import ensure_catalog_indexes, run_catalog_refresher
 
 # CORS Configuration
 origins = [
@@ -20,8 +26,15 @@ origins = [
 async def lifespan(app: FastAPI):
     # Startup: Connect to MongoDB
     await connect_to_mongo()
+    await ensure_shared_state_indexes()
+    await ensure_version_indexes(get_database())
+    await ensure_catalog_indexes(get_database())
+    catalog_task = asyncio.create_task(run_catalog_refresher(get_database()))
     yield
-    # Shutdown: Close connection
+    # Shutdown: Stop background work and close connection. uvicorn has already
+    # waited up to timeout_graceful_shutdown for open requests (and their LLM
+    # calls) before this runs.
+    catalog_task.cancel()
     await close_mongo_connection()
 
 middleware = [
@@ -33,7 +46,8 @@ middleware = [
         allow_headers=["*"],
         expose_headers=["*"],
         max_age=600,
-    )
+    ),
+    Middleware(ProfilingMiddleware),
 ]
 
 app = FastAPI(
@@ -59,6 +73,20 @@ app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 from .api.routes import interactive
 app.include_router(interactive.router, prefix="/api/interactive", tags=["interactive"])
 
+from .api.routes import topics
+app.include_router(topics.router, prefix="/api/topics", tags=["topics"])
+
+from .api.routes import plans
+app.include_router(plans.router, prefix="/api/plans", tags=["plans"])
+
+from .api.routes import admin
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/llm")
+async def llm_queue_metrics():
+    """Queue depth and queue-time metrics of the LLM scheduler."""
+    return llm_scheduler.metrics()
\ No newline at end of file
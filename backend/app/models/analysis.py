@@ -27,6 +27,17 @@ class AnalysisResult(BaseModel):
     topics: Dict[str, TopicDetail]
     summary: Optional[str] = None
 
+class ProgressSummary(BaseModel):
+    total_leaves: int = 0
+    completed_leaves: int = 0
+    total_hours: float = 0.0
+    completed_hours: float = 0.0
+    percent: float = 0.0
+    revision: int = 0
+
+class TopicProgressUpdate(BaseModel):
+    completed: bool
+
 class SyllabusAnalysis(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     user_id: Optional[PyObjectId] = Field(default=None)
@@ -35,6 +46,7 @@ class SyllabusAnalysis(BaseModel):
     analysis_result: Dict[str, Any]
     created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
     version: int = 1
+    progress: Optional[ProgressSummary] = None
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -45,3 +57,19 @@ class SyllabusAnalysisCreate(BaseModel):
     filename: str
     content_hash: str
     analysis_result: Dict[str, Any]
+
+class AnalysisVersionInfo(BaseModel):
+    version: int
+    created_at: datetime
+    kind: str # "snapshot" or "delta"
+    size: int # Stored payload size in bytes
+
+class AnalysisVersion(BaseModel):
+    version: int
+    created_at: datetime
+    analysis_result: Dict[str, Any]
+
+class AnalysisVersionDiff(BaseModel):
+    from_version: int
+    to_version: int
+    patch: List[Dict[str, Any]]
@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import List, Optional, Dict
+from datetime import datetime
+from .analysis import PyObjectId
+
+class StudyPlanCreate(BaseModel):
+    analysis_ids: List[str]
+    start_date: datetime
+    daily_hours: float = Field(default=2.0, gt=0)
+    days_off: List[int] = [] # 0=Monday, 6=Sunday
+    exam_dates: Dict[str, datetime] = {} # analysis_id -> exam date
+
+class PlanItem(BaseModel):
+    analysis_id: str
+    course_name: str
+    topic_id: Optional[str] = None
+    name: str
+    importance: str
+    hours: float
+    scheduled_date: str # ISO Format YYYY-MM-DD
+    late: bool = False # Scheduled on or after the course's exam date
+
+class PlanCourse(BaseModel):
+    analysis_id: str
+    course_name: str
+    exam_date: Optional[datetime] = None
+    remaining_topics: int
+    remaining_hours: float
+    projected_completion_date: Optional[datetime] = None
+    late_topics: int = 0
+    at_risk: bool = False
+
+class StudyPlanSummary(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    analysis_ids: List[str]
+    start_date: datetime
+    daily_hours: float
+    days_off: List[int] = []
+    projected_completion_date: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True
+    )
+
+class StudyPlan(StudyPlanSummary):
+    exam_dates: Dict[str, datetime] = {}
+    courses: List[PlanCourse] = []
+    items: List[PlanItem] = []
@@ -1,7 +1,8 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Dict
 
 class Topic(BaseModel):
+    id: Optional[str] = None # Stable id used to address the topic in stored analyses
     name: str
     importance: str # e.g., High, Medium, Low
     estimated_hours: Optional[float] = None
@@ -12,6 +13,12 @@ class Topic(BaseModel):
 # Allow Topic to reference itself for subtopics
 Topic.model_rebuild()
 
+class CatalogTopic(BaseModel):
+    name: str
+    count: int = 0 # Times seen across saved analyses
+    median_hours: Optional[float] = None
+    importance: Dict[str, int] = {} # High/Medium/Low -> count
+
 class SyllabusAnalysisResponse(BaseModel):
     filename: Optional[str] = None
     content_hash: Optional[str] = None
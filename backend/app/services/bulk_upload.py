@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import zipfile
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO, Callable, Iterator, List, Optional
+from app.core.config import settings
+from app.services.ollama_service import analyze_syllabus
+from app.utils.file_processing import extract_text_from_bytes
+
+logger = logging.getLogger(__name__)
+
+ZIP_CONTENT_TYPES = ["application/zip", "application/x-zip-compressed", "application/x-zip"]
+
+EXTENSION_CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+}
+
+@dataclass
+class BulkEntry:
+    """
+    One syllabus to process. `read` returns its bytes only when a worker slot
+    is free; it blocks (file I/O, decompression) and is run in a thread.
+    """
+    filename: str
+    content_type: Optional[str]
+    size: int
+    read: Callable[[], bytes]
+    error: Optional[str] = None # Set for uploads that failed before processing, e.g. corrupt archives
+
+def is_zip_upload(filename: Optional[str], content_type: Optional[str]) -> bool:
+    return content_type in ZIP_CONTENT_TYPES or (filename or "").lower().endswith(".zip")
+
+def content_type_for(filename: str) -> Optional[str]:
+    return EXTENSION_CONTENT_TYPES.get(os.path.splitext(filename)[1].lower())
+
+def iter_zip_entries(archive: BinaryIO) -> Iterator[BulkEntry]:
+    """
+    Yields the supported documents inside a ZIP archive. Entries are read one at
+    a time straight from the archive when processed, never extracted up front.
+    """
+    zf = zipfile.ZipFile(archive) # Raises BadZipFile right away for invalid archives
+    return _zip_entries(zf)
+
+def _zip_entries(zf: zipfile.ZipFile) -> Iterator[BulkEntry]:
+    # Entries are read from worker threads; one archive is read by one thread at a time
+    lock = threading.Lock()
+    for info in zf.infolist():
+        name = info.filename
+        if info.is_dir() or os.path.basename(name).startswith(".") or name.startswith("__MACOSX/"):
+            continue
+        yield BulkEntry(
+            filename=name,
+            content_type=content_type_for(name),
+            size=info.file_size,
+            read=lambda info=info: _read_zip_entry(zf, info, lock),
+        )
+
+def _read_zip_entry(zf: zipfile.ZipFile, info: zipfile.ZipInfo, lock: threading.Lock) -> bytes:
+    # The header size can lie, so cap what is actually decompressed as well.
+    limit = settings.BULK_UPLOAD_MAX_FILE_BYTES
+    with lock, zf.open(info) as fh:
+        data = fh.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError(f"File exceeds the {limit // (1024 * 1024)} MB limit.")
+    return data
+
+async def process_bulk(entries: Iterator[BulkEntry], user_key: str = "anonymous") -> AsyncIterator[str]:
+    """
+    Extracts and analyzes every entry with at most BULK_UPLOAD_CONCURRENCY files
+    in flight, yielding one NDJSON line per file as soon as it finishes, followed
+    by a summary line. Failures are reported per file and never abort the batch;
+    files beyond BULK_UPLOAD_MAX_FILES each get an error line.
+    """
+    semaphore = asyncio.Semaphore(settings.BULK_UPLOAD_CONCURRENCY)
+    seen_hashes = {}
+    counts = {"ok": 0, "duplicate": 0, "error": 0}
+
+    async def worker(entry: BulkEntry) -> dict:
+        async with semaphore:
+            try:
+                if entry.error:
+                    raise ValueError(entry.error)
+                if entry.content_type not in EXTENSION_CONTENT_TYPES.values():
+                    raise ValueError("Unsupported file type. Allowed types: PDF, DOCX, TXT.")
+                if entry.size > settings.BULK_UPLOAD_MAX_FILE_BYTES:
+                    raise ValueError(f"File exceeds the {settings.BULK_UPLOAD_MAX_FILE_BYTES // (1024 * 1024)} MB limit.")
+
+                file_bytes = await asyncio.to_thread(entry.read)
+                file_hash = hashlib.sha256(file_bytes).hexdigest()
+                if file_hash in seen_hashes:
+                    return {"filename": entry.filename, "status": "duplicate", "duplicate_of": seen_hashes[file_hash]}
+                seen_hashes[file_hash] = entry.filename
+
+                text_content = await asyncio.to_thread(
+                    extract_text_from_bytes, file_bytes, entry.content_type, entry.filename
+                )
+                content_hash = hashlib.sha256(text_content.encode()).hexdigest()
+                # Plain text hashes the same as its own bytes, which were recorded above
+                if content_hash != file_hash and content_hash in seen_hashes:
+                    return {"filename": entry.filename, "status": "duplicate", "duplicate_of": seen_hashes[content_hash]}
+                seen_hashes[content_hash] = entry.filename
+
+                analysis_result = await analyze_syllabus(text_content, user_key)
+                analysis_result.filename = entry.filename
+                analysis_result.content_hash = content_hash
+                return {"filename": entry.filename, "status": "ok", "result": analysis_result.model_dump()}
+            except ValueError as ve:
+                return {"filename": entry.filename, "status": "error", "detail": str(ve)}
+            except Exception as e:
+                logger.exception(f"Unexpected error processing {entry.filename}: {e}")
+                return {"filename": entry.filename, "status": "error", "detail": "Unexpected error processing this file."}
+
+    tasks: List[asyncio.Task] = []
+    try:
+        for entry in entries:
+            if len(tasks) >= settings.BULK_UPLOAD_MAX_FILES:
+                counts["error"] += 1
+                yield json.dumps({"filename": entry.filename, "status": "error",
+                                  "detail": f"Batch limit of {settings.BULK_UPLOAD_MAX_FILES} files reached; file skipped."}) + "\n"
+                continue
+            tasks.append(asyncio.create_task(worker(entry)))
+
+        for finished in asyncio.as_completed(tasks):
+            line = await finished
+            counts[line["status"]] += 1
+            yield json.dumps(line, default=str) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield json.dumps({"status": "done", "total": sum(counts.values()), **counts}) + "\n"
@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Dict, List, Tuple
+from app.core.config import settings
+
+class Priority(IntEnum):
+    """LLM work classes, served strictly in this order."""
+    INTERACTIVE = 0 # Topic chat
+    QUIZ = 1
+    BULK = 2 # Syllabus analysis
+
+# Relative cost of one request in each class, used to advance a user's
+# virtual finish time: heavy analyses use up a user's fair share faster.
+PRIORITY_COST = {
+    Priority.INTERACTIVE: 1.0,
+    Priority.QUIZ: 2.0,
+    Priority.BULK: 4.0,
+}
+
+# Queue wait after which a lower-priority request is served ahead of higher
+# classes, so sustained chat traffic cannot starve analyses forever
+AGING_SECONDS = {
+    Priority.INTERACTIVE: 0.0,
+    Priority.QUIZ: 20.0,
+    Priority.BULK: 60.0,
+}
+
+# Number of recent queue waits kept per class for percentile metrics
+METRICS_WINDOW = 500
+
+@dataclass(order=True)
+class _Ticket:
+    finish_tag: float
+    seq: int
+    user_key: str = field(compare=False)
+    priority: Priority = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+class LLMScheduler:
+    """
+    Admission control in front of Ollama.
+
+    Requests wait for one of `max_concurrency` slots. Higher priority classes
+    are served first, except that a request waiting longer than its class's
+    AGING_SECONDS jumps ahead. Within a class, users are served by weighted
+    fair queuing (smallest virtual finish tag first) so one busy user cannot
+    starve the others. `per_user_limit` applies per class, so a user's chat
+    never waits behind their own running analysis.
+    """
+
+    def __init__(self, max_concurrency: int, per_user_limit: int):
+        self.max_concurrency = max_concurrency
+        self.per_user_limit = per_user_limit
+        self._queues: Dict[Priority, List[_Ticket]] = {p: [] for p in Priority}
+        self._virtual_time: Dict[Priority, float] = {p: 0.0 for p in Priority}
+        self._user_finish: Dict[Priority, Dict[str, float]] = {p: {} for p in Priority}
+        self._max_finish: Dict[Priority, float] = {p: 0.0 for p in Priority}
+        self._in_flight = 0
+        self._user_in_flight: Dict[Tuple[str, Priority], int] = defaultdict(int)
+        self._seq = itertools.count()
+        self._waits: Dict[Priority, deque] = {p: deque(maxlen=METRICS_WINDOW) for p in Priority}
+        self._dispatched: Dict[Priority, int] = {p: 0 for p in Priority}
+
+    @asynccontextmanager
+    async def slot(self, user_key: str, priority: Priority):
+        """Waits for a free slot for `user_key` and holds it for the duration of the block."""
+        ticket = self._enqueue(user_key, priority)
+        self._dispatch()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Slot was granted just as the caller went away
+                self._release(user_key, priority)
+            else:
+                ticket.cancelled = True
+                self._refund(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(user_key, priority)
+
+    def _enqueue(self, user_key: str, priority: Priority) -> _Ticket:
+        finishes = self._user_finish[priority]
+        start = max(self._virtual_time[priority], finishes.get(user_key, 0.0))
+        finish_tag = start + PRIORITY_COST[priority]
+        finishes[user_key] = finish_tag
+        ticket = _Ticket(
+            finish_tag=finish_tag,
+            seq=next(self._seq),
+            user_key=user_key,
+            priority=priority,
+            enqueued_at=time.monotonic(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._queues[priority], ticket)
+        return ticket
+
+    def _refund(self, ticket: _Ticket):
+        """Gives back the fair-share cost of a ticket that left without being served."""
+        finishes = self._user_finish[ticket.priority]
+        if ticket.user_key in finishes:
+            finish = finishes[ticket.user_key] - PRIORITY_COST[ticket.priority]
+            if finish > self._virtual_time[ticket.priority]:
+                finishes[ticket.user_key] = finish
+            else:
+                del finishes[ticket.user_key]
+        self._prune_finishes(ticket.priority)
+
+    def _prune_finishes(self, priority: Priority):
+        # A finish tag at or behind virtual time has no effect (new tickets start
+        # at virtual time anyway), so drop it to keep one entry per active user only.
+        # Once nobody is waiting, virtual time catches up with everything served.
+        if not any(not t.cancelled for t in self._queues[priority]):
+            self._virtual_time[priority] = max(self._virtual_time[priority], self._max_finish[priority])
+        virtual_time = self._virtual_time[priority]
+        finishes = self._user_finish[priority]
+        for user_key in [u for u, finish in finishes.items() if finish <= virtual_time]:
+            del finishes[user_key]
+
+    def _aged(self, priority: Priority, now: float) -> bool:
+        threshold = AGING_SECONDS[priority]
+        return threshold > 0 and any(
+            not t.cancelled and now - t.enqueued_at >= threshold for t in self._queues[priority]
+        )
+
+    def _next_ticket(self):
+        now = time.monotonic()
+        for priority in sorted(Priority, key=lambda p: (not self._aged(p, now), p)):
+            queue = self._queues[priority]
+            skipped = []
+            chosen = None
+            while queue:
+                ticket = heapq.heappop(queue)
+                if ticket.cancelled:
+                    continue
+                if self._user_in_flight.get((ticket.user_key, priority), 0) >= self.per_user_limit:
+                    skipped.append(ticket)
+                    continue
+                chosen = ticket
+                break
+            for ticket in skipped:
+                heapq.heappush(queue, ticket)
+            if chosen:
+                return chosen
+        return None
+
+    def _dispatch(self):
+        while self._in_flight < self.max_concurrency:
+            ticket = self._next_ticket()
+            if ticket is None:
+                return
+            self._in_flight += 1
+            self._user_in_flight[(ticket.user_key, ticket.priority)] += 1
+            self._virtual_time[ticket.priority] = max(self._virtual_time[ticket.priority], ticket.finish_tag - PRIORITY_COST[ticket.priority])
+            self._waits[ticket.priority].append(time.monotonic() - ticket.enqueued_at)
+            self._dispatched[ticket.priority] += 1
+            self._max_finish[ticket.priority] = max(self._max_finish[ticket.priority], ticket.finish_tag)
+            self._prune_finishes(ticket.priority)
+            ticket.future.set_result(None)
+
+    def _release(self, user_key: str, priority: Priority):
+        self._in_flight -= 1
+        key = (user_key, priority)
+        self._user_in_flight[key] -= 1
+        if self._user_in_flight[key] <= 0:
+            del self._user_in_flight[key]
+        self._dispatch()
+
+    def metrics(self) -> dict:
+        """Queue depth and queue-time statistics per priority class."""
+        classes = {}
+        for priority in Priority:
+            waits = sorted(self._waits[priority])
+            classes[priority.name.lower()] = {
+                "queued": sum(1 for t in self._queues[priority] if not t.cancelled),
+                "dispatched": self._dispatched[priority],
+                "wait_avg_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                "wait_p95_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+                "wait_max_ms": round(1000 * waits[-1], 1) if waits else 0.0,
+            }
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "per_user_limit": self.per_user_limit,
+            "users_in_flight": len({user_key for user_key, _ in self._user_in_flight}),
+            "classes": classes,
+        }
+
+llm_scheduler = LLMScheduler(settings.OLLAMA_MAX_CONCURRENCY, settings.LLM_USER_MAX_IN_FLIGHT)
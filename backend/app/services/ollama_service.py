@@ -3,13 +3,23 @@ import json
 import logging
 from app.core.config import settings
 from app.models.syllabus import SyllabusAnalysisResponse, Topic
+from app.utils.outline_parser import parse_outline
+from app.services.llm_scheduler import llm_scheduler, Priority
+from app.services.topic_catalog import apply_catalog_estimates
+from app.core.database import get_database
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def call_ollama(prompt: str, model: str, json_mode: bool = True) -> str:
-    """Helper to call local Ollama API."""
+async def call_ollama(
+    prompt: str,
+    model: str,
+    json_mode: bool = True,
+    priority: Priority = Priority.BULK,
+    user_key: str = "anonymous",
+) -> str:
+    """Helper to call local Ollama API, queued through the LLM scheduler."""
     url = f"{settings.OLLAMA_BASE_URL}/api/generate"
     payload = {
         "model": model,
@@ -19,18 +29,51 @@ async def call_ollama(prompt: str, model: str, json_mode: bool = True) -> str:
     if json_mode:
         payload["format"] = "json"
     
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            return result.get("response", "")
-        except Exception as e:
-            logger.error(f"Ollama API error: {e}")
-            raise ValueError(f"Failed to communicate with local Ollama: {str(e)}")
-
-async def analyze_syllabus(text_content: str) -> SyllabusAnalysisResponse:
+    async with llm_scheduler.slot(user_key, priority):
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            try:
+                response = await client.post(url, json=payload)
+                response.raise_for_status()
+                result = response.json()
+                return result.get("response", "")
+            except Exception as e:
+                logger.error(f"Ollama API error: {e}")
+                raise ValueError(f"Failed to communicate with local Ollama: {str(e)}")
+
+async def analyze_syllabus(text_content: str, user_key: str = "anonymous") -> SyllabusAnalysisResponse:
     """Analyze syllabus using local Llama 3.2."""
+    # Rule-based pass first: well-structured syllabi need no LLM call at all,
+    # the rest get a prompt without the administrative boilerplate.
+    outline = parse_outline(text_content)
+    if outline.confidence >= settings.OUTLINE_SKIP_LLM_CONFIDENCE:
+        logger.info(f"Outline parsed with confidence {outline.confidence}, skipping LLM.")
+        raw_topics = outline.to_topic_dicts()
+    else:
+        if outline.confidence >= settings.OUTLINE_PROMPT_CONFIDENCE:
+            content = outline.render()
+            source = "Syllabus outline (hours in parentheses are given by the syllabus)"
+        else:
+            content = outline.cleaned_text or text_content
+            source = "Syllabus content"
+        logger.info(
+            f"Outline confidence {outline.confidence}, sending {len(content)} of {len(text_content)} chars to LLM."
+        )
+        raw_topics = await _llm_extract_topics(content, source, user_key)
+
+    # Fill in or correct hour estimates from topics seen in other syllabi
+    raw_topics = await apply_catalog_estimates(get_database(), raw_topics)
+
+    # Reuse logic from other services for validation/calculation
+    validated_topics, total_hours, priority_topics = await _recursive_topic_processor(raw_topics)
+    
+    return SyllabusAnalysisResponse(
+        topics=validated_topics,
+        total_study_hours=total_hours if total_hours > 0 else None,
+        priority_topics=list({topic.name: topic for topic in priority_topics}.values())
+    )
+
+async def _llm_extract_topics(content: str, source: str, user_key: str) -> list:
+    """Asks the analysis model for the topic tree of the given syllabus text."""
     prompt = f"""
     Analyze the following syllabus content. Extract:
     1. A hierarchical list of all topics and subtopics.
@@ -56,24 +99,15 @@ async def analyze_syllabus(text_content: str) -> SyllabusAnalysisResponse:
       ]
     }}
 
-    Syllabus content:
+    {source}:
     ---
-    {text_content}
+    {content}
     ---
     """
     
-    raw_response = await call_ollama(prompt, settings.OLLAMA_ANALYSIS_MODEL)
+    raw_response = await call_ollama(prompt, settings.OLLAMA_ANALYSIS_MODEL, priority=Priority.BULK, user_key=user_key)
     parsed_data = json.loads(raw_response)
-    raw_topics = parsed_data.get('topics', [])
-
-    # Reuse logic from other services for validation/calculation
-    validated_topics, total_hours, priority_topics = await _recursive_topic_processor(raw_topics)
-    
-    return SyllabusAnalysisResponse(
-        topics=validated_topics,
-        total_study_hours=total_hours if total_hours > 0 else None,
-        priority_topics=list({topic.name: topic for topic in priority_topics}.values())
-    )
+    return parsed_data.get('topics', [])
 
 async def _recursive_topic_processor(topic_data_list: list) -> tuple[list[Topic], float, list[Topic]]:
     """Helper for topic tree construction."""
@@ -112,7 +146,7 @@ async def _recursive_topic_processor(topic_data_list: list) -> tuple[list[Topic]
 
     return validated_topics, total_hours, priority_topics
 
-async def generate_quiz(topic_name: str, context: str, difficulty: str = "Medium") -> dict:
+async def generate_quiz(topic_name: str, context: str, difficulty: str = "Medium", user_key: str = "anonymous") -> dict:
     """Generate a quiz for a specific topic."""
     prompt = f"""
     Generate a 5-question quiz for the topic '{topic_name}'.
@@ -132,14 +166,14 @@ async def generate_quiz(topic_name: str, context: str, difficulty: str = "Medium
         ]
     }}
     """
-    response = await call_ollama(prompt, settings.OLLAMA_ANALYSIS_MODEL)
+    response = await call_ollama(prompt, settings.OLLAMA_ANALYSIS_MODEL, priority=Priority.QUIZ, user_key=user_key)
     try:
         return json.loads(response)
     except json.JSONDecodeError:
         # Fallback if model outputs text frame
         return {"questions": [], "error": "Failed to parse quiz format"}
 
-async def chat_with_context(user_query: str, topic_context: str) -> str:
+async def chat_with_context(user_query: str, topic_context: str, user_key: str = "anonymous") -> str:
     """Chat with AI about a specific topic."""
     
     # Parse context to clean text to prevent model from hallucinating JSON
@@ -174,4 +208,6 @@ async def chat_with_context(user_query: str, topic_context: str) -> str:
     AI Tutor Answer:
     """
     # Use a faster model for chat if available, or same analysis model
-    return await call_ollama(prompt, settings.OLLAMA_ANALYSIS_MODEL, json_mode=False)
+    return await call_ollama(
+        prompt, settings.OLLAMA_ANALYSIS_MODEL, json_mode=False, priority=Priority.INTERACTIVE, user_key=user_key
+    )
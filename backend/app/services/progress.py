@@ -0,0 +1,149 @@
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
+
+def new_topic_id() -> str:
+    """
+    Short random id used to address a topic inside a stored analysis. The "t"
+    prefix keeps it from ever looking like a dotted index path.
+    """
+    return "t" + uuid.uuid4().hex[:12]
+
+def ensure_topic_ids(topics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Assigns a stable `id` to every topic in the tree that does not have one yet."""
+    for topic in topics:
+        if not topic.get("id"):
+            topic["id"] = new_topic_id()
+        ensure_topic_ids(topic.get("subtopics") or [])
+    return topics
+
+def _leaf_hours(topic: Dict[str, Any]) -> float:
+    try:
+        return float(topic.get("estimated_hours") or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def compute_progress(topics: List[Dict[str, Any]], revision: int = 0) -> Dict[str, Any]:
+    """
+    Walks the topic tree once and returns the denormalized progress counters
+    stored alongside an analysis. Only leaves count towards the totals.
+    """
+    totals = {"total_leaves": 0, "completed_leaves": 0, "total_hours": 0.0, "completed_hours": 0.0}
+
+    def walk(nodes):
+        for node in nodes:
+            children = node.get("subtopics") or []
+            if children:
+                walk(children)
+                continue
+            hours = _leaf_hours(node)
+            totals["total_leaves"] += 1
+            totals["total_hours"] += hours
+            if node.get("completed"):
+                totals["completed_leaves"] += 1
+                totals["completed_hours"] += hours
+
+    walk(topics)
+    return _with_percent(totals, revision)
+
+def _with_percent(totals: Dict[str, Any], revision: int) -> Dict[str, Any]:
+    total = totals["total_leaves"]
+    percent = round(100.0 * totals["completed_leaves"] / total, 2) if total else 0.0
+    return {
+        **totals,
+        "total_hours": round(totals["total_hours"], 2),
+        "completed_hours": round(totals["completed_hours"], 2),
+        "percent": percent,
+        "revision": revision,
+    }
+
+def find_topic_chain(topics: List[Dict[str, Any]], ref: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Resolves a topic reference to the chain of nodes from the root down to it.
+    `ref` is a topic id or, failing that, a dotted index path such as "0.2.1".
+    """
+    def search(nodes, trail):
+        for node in nodes:
+            path = trail + [node]
+            if node.get("id") == ref:
+                return path
+            found = search(node.get("subtopics") or [], path)
+            if found:
+                return found
+        return None
+
+    found = search(topics, [])
+    if found:
+        return found
+
+    # Older clients address topics by index path
+    parts = ref.split(".")
+    if all(p.isdigit() for p in parts):
+        chain, level = [], topics
+        for p in parts:
+            idx = int(p)
+            if idx >= len(level):
+                return None
+            chain.append(level[idx])
+            level = level[idx].get("subtopics") or []
+        return chain
+    return None
+
+def plan_completion_update(
+    topics: List[Dict[str, Any]],
+    chain: List[Dict[str, Any]],
+    completed: bool,
+    progress: Dict[str, Any],
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Works out the minimal `$set` needed to flip `completed` on the target topic.
+
+    Mirrors the UI semantics: the new state cascades down to every descendant,
+    and ancestors are marked completed only when all of their children are.
+    Each touched node is addressed through an array filter on its `id`, so the
+    write never depends on array positions. Returns the `$set` document, the
+    array filters and the new progress counters.
+    """
+    identifiers: Dict[str, str] = {}
+    filters: List[Dict[str, Any]] = []
+    updates: Dict[str, Any] = {}
+    deltas = {"leaves": 0, "hours": 0.0}
+
+    def ident(node):
+        node_id = node["id"]
+        if node_id not in identifiers:
+            identifiers[node_id] = f"t{len(identifiers)}"
+            filters.append({f"{identifiers[node_id]}.id": node_id})
+        return identifiers[node_id]
+
+    def field_path(path_nodes):
+        return "analysis_result.topics." + ".subtopics.".join(f"$[{ident(n)}]" for n in path_nodes)
+
+    def set_state(path_nodes, state):
+        node = path_nodes[-1]
+        if bool(node.get("completed")) != state:
+            updates[field_path(path_nodes) + ".completed"] = state
+            if not node.get("subtopics"):
+                sign = 1 if state else -1
+                deltas["leaves"] += sign
+                deltas["hours"] += sign * _leaf_hours(node)
+            node["completed"] = state
+        for child in node.get("subtopics") or []:
+            set_state(path_nodes + [child], state)
+
+    set_state(chain, completed)
+
+    # Re-evaluate ancestors bottom-up now that the subtree has changed.
+    for depth in range(len(chain) - 1, 0, -1):
+        parent = chain[depth - 1]
+        all_done = all(c.get("completed") for c in parent.get("subtopics") or [])
+        if bool(parent.get("completed")) != all_done:
+            updates[field_path(chain[:depth]) + ".completed"] = all_done
+            parent["completed"] = all_done
+
+    totals = {
+        "total_leaves": progress["total_leaves"],
+        "completed_leaves": progress["completed_leaves"] + deltas["leaves"],
+        "total_hours": progress["total_hours"],
+        "completed_hours": progress["completed_hours"] + deltas["hours"],
+    }
+    return updates, filters, _with_percent(totals, progress.get("revision", 0) + 1)
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import re
+from collections import Counter
+from datetime import datetime
+from statistics import median
+from typing import Any, Dict, List, Optional
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+# Catalog of topics seen across all saved analyses, keyed by a normalized name.
+# Each entry keeps recent hour estimates (to derive a median) and how often
+# the topic was rated High/Medium/Low. It is built incrementally by
+# refresh_topic_catalog, which only looks at analyses saved since its last run.
+
+HOURS_SAMPLE_LIMIT = 200
+FUZZY_MIN_SIMILARITY = 0.3 # Trigram Jaccard similarity needed for a fuzzy match
+IMPORTANCE_LEVELS = ("High", "Medium", "Low")
+
+_NUMBERING_RE = re.compile(
+    r"^(?:(?:unit|module|chapter|week|part|lecture|topic)\s+[0-9ivx]+(?:\.[0-9]+)*|[0-9]+(?:\.[0-9]+)*|[ivx]+[.)])[.):\-\s]+",
+    re.IGNORECASE,
+)
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9+#]+")
+
+def normalize_topic_name(name: str) -> str:
+    """Canonical key: lowercase, numbering prefixes and punctuation removed."""
+    name = _NUMBERING_RE.sub("", (name or "").strip())
+    return _NON_ALNUM_RE.sub(" ", name.lower()).strip()
+
+def trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+async def ensure_catalog_indexes(db) -> None:
+    await db.topic_catalog.create_index("trigrams")
+    await db.topic_catalog.create_index([("count", -1)])
+
+def _iter_leaves(topics: List[Dict[str, Any]]):
+    for topic in topics or []:
+        children = topic.get("subtopics") or []
+        if children:
+            yield from _iter_leaves(children)
+        else:
+            yield topic
+
+async def refresh_topic_catalog(db, batch_size: int = 200) -> int:
+    """Folds analyses saved since the last run into the catalog. Returns how many were processed."""
+    processed = 0
+    while True:
+        state = await db.catalog_state.find_one({"_id": "topic_catalog"}) or {}
+        query = {}
+        if state.get("last_analysis_id"):
+            query["_id"] = {"$gt": state["last_analysis_id"]}
+        docs = await db.analyses.find(query, {"analysis_result.topics": 1}).sort("_id", 1).to_list(batch_size)
+        if not docs:
+            return processed
+
+        names: Dict[str, Counter] = {}
+        hours: Dict[str, List[float]] = {}
+        importance: Dict[str, Counter] = {}
+        for doc in docs:
+            for leaf in _iter_leaves((doc.get("analysis_result") or {}).get("topics")):
+                key = normalize_topic_name(leaf.get("name", ""))
+                if not key:
+                    continue
+                names.setdefault(key, Counter())[leaf["name"].strip()] += 1
+                importance.setdefault(key, Counter())
+                level = str(leaf.get("importance") or "").capitalize()
+                if level in IMPORTANCE_LEVELS:
+                    importance[key][level] += 1
+                try:
+                    value = float(leaf.get("estimated_hours"))
+                    if value > 0:
+                        hours.setdefault(key, []).append(value)
+                except (TypeError, ValueError):
+                    pass
+
+        ops = []
+        for key, seen in names.items():
+            update = {
+                "$inc": {"count": sum(seen.values()), **{f"importance.{k}": v for k, v in importance[key].items()}},
+                "$setOnInsert": {"name": seen.most_common(1)[0][0], "trigrams": trigrams(key)},
+                "$set": {"updated_at": datetime.utcnow()},
+            }
+            if key in hours:
+                update["$inc"]["hours_count"] = len(hours[key])
+                update["$push"] = {"hours_samples": {"$each": hours[key], "$slice": -HOURS_SAMPLE_LIMIT}}
+            ops.append(UpdateOne({"_id": key}, update, upsert=True))
+        if ops:
+            await db.topic_catalog.bulk_write(ops, ordered=False)
+
+        touched = await db.topic_catalog.find(
+            {"_id": {"$in": list(hours.keys())}}, {"hours_samples": 1}
+        ).to_list(None)
+        medians = [
+            UpdateOne({"_id": entry["_id"]}, {"$set": {"median_hours": round(median(entry["hours_samples"]), 2)}})
+            for entry in touched if entry.get("hours_samples")
+        ]
+        if medians:
+            await db.topic_catalog.bulk_write(medians, ordered=False)
+
+        await db.catalog_state.update_one(
+            {"_id": "topic_catalog"},
+            {"$set": {"last_analysis_id": docs[-1]["_id"], "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        processed += len(docs)
+        if len(docs) < batch_size:
+            return processed
+
+async def run_catalog_refresher(db) -> None:
+    """
+    Background loop started with the app; keeps the catalog up to date. With
+    several workers, only the one holding the refresh lease does the work.
+    """
+    while True:
+        try:
+            if not await shared_state.acquire_lease("topic-catalog-refresh", settings.TOPIC_CATALOG_REFRESH_SECONDS * 2):
+                await asyncio.sleep(settings.TOPIC_CATALOG_REFRESH_SECONDS)
+                continue
+            processed = await refresh_topic_catalog(db)
+            if processed:
+                logger.info(f"Topic catalog updated from {processed} analyses.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Topic catalog refresh failed: {e}")
+        await asyncio.sleep(settings.TOPIC_CATALOG_REFRESH_SECONDS)
+
+_PUBLIC_FIELDS = {"name": 1, "count": 1, "median_hours": 1, "importance": 1}
+
+async def search_topics(db, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Prefix matches first (most common topics first), topped up with fuzzy trigram matches."""
+    key = normalize_topic_name(query)
+    if not key:
+        return []
+
+    results = await db.topic_catalog.find(
+        {"_id": {"$regex": "^" + re.escape(key)}}, _PUBLIC_FIELDS
+    ).sort("count", -1).to_list(limit)
+    if len(results) >= limit:
+        return results
+
+    seen = [r["_id"] for r in results]
+    query_grams = trigrams(key)
+    # Score every entry sharing a trigram in Mongo (Jaccard similarity of the
+    # trigram sets) so the best matches are never cut off before ranking.
+    # (trigram lists hold no duplicates, so this equals $setIntersection's size)
+    overlap = {"$size": {"$filter": {"input": "$trigrams", "cond": {"$in": ["$$this", query_grams]}}}}
+    union = {"$subtract": [{"$add": [{"$size": "$trigrams"}, len(query_grams)]}, overlap]}
+    fuzzy = await db.topic_catalog.aggregate([
+        {"$match": {"trigrams": {"$in": query_grams}, "_id": {"$nin": seen}}},
+        {"$project": {**_PUBLIC_FIELDS, "similarity": {"$divide": [overlap, union]}}},
+        {"$match": {"similarity": {"$gte": FUZZY_MIN_SIMILARITY}}},
+        {"$sort": {"similarity": -1, "count": -1}},
+        {"$limit": limit - len(results)},
+    ]).to_list(None)
+    for entry in fuzzy:
+        entry.pop("similarity", None)
+        results.append(entry)
+    return results
+
+async def apply_catalog_estimates(db, topics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fills in missing leaf hour estimates from the catalog median, and replaces
+    estimates more than TOPIC_CATALOG_OUTLIER_FACTOR away from it. Only topics
+    with at least TOPIC_CATALOG_MIN_SAMPLES samples are used. Modifies `topics`.
+    """
+    if db is None:
+        return topics
+    leaves = [leaf for leaf in _iter_leaves(topics) if normalize_topic_name(leaf.get("name", ""))]
+    if not leaves:
+        return topics
+
+    keys = list({normalize_topic_name(leaf["name"]) for leaf in leaves})
+    entries = await db.topic_catalog.find(
+        {
+            "_id": {"$in": keys},
+            "median_hours": {"$gt": 0},
+            "hours_count": {"$gte": settings.TOPIC_CATALOG_MIN_SAMPLES},
+        },
+        {"median_hours": 1}
+    ).to_list(None)
+    medians = {e["_id"]: e["median_hours"] for e in entries}
+
+    factor = settings.TOPIC_CATALOG_OUTLIER_FACTOR
+    for leaf in leaves:
+        reference = medians.get(normalize_topic_name(leaf["name"]))
+        if reference is None:
+            continue
+        try:
+            current: Optional[float] = float(leaf.get("estimated_hours"))
+        except (TypeError, ValueError):
+            current = None
+        if current is None or current <= 0 or not (reference / factor <= current <= reference * factor):
+            leaf["estimated_hours"] = reference
+    return topics
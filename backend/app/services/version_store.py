@@ -0,0 +1,147 @@
+import asyncio
+import copy
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.utils.json_patch import make_patch, apply_patch
+
+# A full snapshot is stored every SNAPSHOT_INTERVAL versions so rebuilding any
+# version never replays more than SNAPSHOT_INTERVAL - 1 deltas.
+SNAPSHOT_INTERVAL = 10
+
+# If a delta is at least this fraction of the full document it is cheaper to
+# just store a snapshot.
+SNAPSHOT_SIZE_RATIO = 0.5
+
+# Versions cover content only. These per-topic fields are progress state, changed
+# by the topic progress PATCH without a new version, so they are left out of
+# stored versions and diffs.
+PROGRESS_TOPIC_FIELDS = ("completed", "id")
+
+def content_only(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an analysis result without the per-topic progress fields."""
+    def strip(topics):
+        for topic in topics or []:
+            for name in PROGRESS_TOPIC_FIELDS:
+                topic.pop(name, None)
+            strip(topic.get("subtopics"))
+
+    result = copy.deepcopy(result)
+    strip(result.get("topics"))
+    return result
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, default=str))
+
+async def ensure_version_indexes(db) -> None:
+    await db.analysis_versions.create_index([("analysis_id", 1), ("version", -1)], unique=True)
+
+async def record_version(
+    db,
+    analysis_id: ObjectId,
+    version: int,
+    result: Dict[str, Any],
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Stores `result` as `version` of the analysis. `previous` is the result of
+    version - 1; when given, only the delta against it is stored unless a
+    snapshot is due. Progress fields are stripped from both (see
+    PROGRESS_TOPIC_FIELDS). The entry is returned without its payload.
+    """
+    result = content_only(result)
+    entry = {
+        "analysis_id": analysis_id,
+        "version": version,
+        "created_at": datetime.utcnow(),
+    }
+
+    patch = None
+    if previous is not None and version % SNAPSHOT_INTERVAL != 1:
+        patch = make_patch(content_only(previous), result)
+        if _size(patch) >= SNAPSHOT_SIZE_RATIO * _size(result):
+            patch = None
+
+    if patch is None:
+        entry["kind"] = "snapshot"
+        entry["snapshot"] = result
+        entry["size"] = _size(result)
+    else:
+        entry["kind"] = "delta"
+        entry["patch"] = patch
+        entry["size"] = _size(patch)
+
+    await db.analysis_versions.insert_one(entry)
+    return {k: v for k, v in entry.items() if k not in ("snapshot", "patch", "_id")}
+
+async def list_versions(db, analysis_id: ObjectId) -> List[Dict[str, Any]]:
+    return await db.analysis_versions.find(
+        {"analysis_id": analysis_id},
+        {"_id": 0, "snapshot": 0, "patch": 0}
+    ).sort("version", -1).to_list(None)
+
+async def get_version(db, analysis_id: ObjectId, version: int) -> Optional[Dict[str, Any]]:
+    """Rebuilds `version` from the nearest snapshot at or below it plus the deltas after it."""
+    base = await db.analysis_versions.find_one(
+        {"analysis_id": analysis_id, "kind": "snapshot", "version": {"$lte": version}},
+        sort=[("version", -1)]
+    )
+    if base is None:
+        return None
+
+    result = base["snapshot"]
+    created_at = base["created_at"]
+    if base["version"] < version:
+        deltas = await db.analysis_versions.find(
+            {"analysis_id": analysis_id, "version": {"$gt": base["version"], "$lte": version}},
+            {"version": 1, "patch": 1, "snapshot": 1, "kind": 1, "created_at": 1}
+        ).sort("version", 1).to_list(None)
+        if not deltas or deltas[-1]["version"] != version:
+            return None
+        for entry in deltas:
+            if entry["kind"] == "snapshot":
+                result = entry["snapshot"]
+            else:
+                result = apply_patch(result, entry["patch"], in_place=True)
+            created_at = entry["created_at"]
+
+    return {"version": version, "created_at": created_at, "analysis_result": result}
+
+# How long record_update waits for a concurrent writer to record the version
+# it is based on (documents are written before their version is recorded)
+PREVIOUS_VERSION_WAIT_ATTEMPTS = 10
+PREVIOUS_VERSION_WAIT_SECONDS = 0.05
+
+async def record_update(db, analysis: Dict[str, Any], new_result: Dict[str, Any]) -> int:
+    """
+    Records `new_result` as the next version of a stored analysis and returns
+    the new version number. Analyses saved before history was kept (no version
+    rows at all) get their current content stored as the base snapshot first.
+    """
+    analysis_id = analysis["_id"]
+    current_version = analysis.get("version", 1)
+    previous = await get_version(db, analysis_id, current_version)
+    if previous is None and not await db.analysis_versions.count_documents({"analysis_id": analysis_id}, limit=1):
+        try:
+            await record_version(db, analysis_id, current_version, analysis.get("analysis_result") or {})
+        except DuplicateKeyError:
+            pass # Another writer backfilled it first
+        previous = await get_version(db, analysis_id, current_version)
+    for _ in range(PREVIOUS_VERSION_WAIT_ATTEMPTS):
+        if previous is not None:
+            break
+        # The writer of `current_version` hasn't recorded it yet
+        await asyncio.sleep(PREVIOUS_VERSION_WAIT_SECONDS)
+        previous = await get_version(db, analysis_id, current_version)
+
+    # Without the previous version, store a full snapshot instead of a delta
+    await record_version(
+        db, analysis_id, current_version + 1, new_result,
+        previous["analysis_result"] if previous else None
+    )
+    return current_version + 1
+
+async def delete_versions(db, analysis_id: ObjectId) -> None:
+    await db.analysis_versions.delete_many({"analysis_id": analysis_id})
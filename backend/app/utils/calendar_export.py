@@ -0,0 +1,137 @@
+import csv
+import io
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+# Streaming exporters for scheduled study plans. They walk the raw topic dicts
+# stored in Mongo and yield the output line by line, so no Topic models or full
+# output string are built in memory.
+
+# Deepest topic level included in the export projection
+MAX_EXPORT_DEPTH = 6
+EXPORT_TOPIC_FIELDS = ("id", "name", "importance", "estimated_hours", "scheduled_date", "completed")
+
+# Full projection used when a plan is nested deeper than the compact one reaches
+FULL_EXPORT_PROJECTION = {"filename": 1, "created_at": 1, "analysis_result": 1}
+
+def export_projection() -> Dict[str, int]:
+    """
+    Mongo projection with only the topic fields the exporters use, down to
+    MAX_EXPORT_DEPTH levels. The level below is projected too (names only) so
+    projection_truncated() can tell when deeper topics were cut off.
+    """
+    projection = {"filename": 1, "created_at": 1, "analysis_result.course_name": 1}
+    prefix = "analysis_result.topics"
+    for _ in range(MAX_EXPORT_DEPTH):
+        for name in EXPORT_TOPIC_FIELDS:
+            projection[f"{prefix}.{name}"] = 1
+        prefix += ".subtopics"
+    projection[f"{prefix}.name"] = 1
+    return projection
+
+def projection_truncated(analysis: Dict[str, Any]) -> bool:
+    """True if the document has topics below MAX_EXPORT_DEPTH; refetch with FULL_EXPORT_PROJECTION."""
+    level = (analysis.get("analysis_result") or {}).get("topics") or []
+    for _ in range(MAX_EXPORT_DEPTH):
+        level = [child for topic in level for child in (topic.get("subtopics") or [])]
+    return bool(level)
+
+def iter_scheduled_leaves(
+    topics: List[Dict[str, Any]],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    path: tuple = (),
+) -> Iterator[tuple]:
+    """Yields (path, leaf) for scheduled leaves with date_from <= scheduled_date <= date_to."""
+    for topic in topics or []:
+        children = topic.get("subtopics") or []
+        if children:
+            yield from iter_scheduled_leaves(children, date_from, date_to, path + (topic.get("name", ""),))
+            continue
+        date = topic.get("scheduled_date")
+        if not date:
+            continue
+        # ISO dates compare correctly as strings
+        if (date_from and date < date_from) or (date_to and date > date_to):
+            continue
+        yield path, topic
+
+def _ics_escape(text: str) -> str:
+    return (
+        str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+def _ics_fold(line: str) -> str:
+    """Folds content lines longer than 75 octets as required by RFC 5545."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Don't split a multi-byte character
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+def stream_ics(
+    analysis: Dict[str, Any],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> Iterator[str]:
+    result = analysis.get("analysis_result") or {}
+    course = result.get("course_name") or analysis.get("filename") or "Study Plan"
+    stamp = (analysis.get("created_at") or datetime.utcnow()).strftime("%Y%m%dT%H%M%SZ")
+
+    yield _ics_fold("BEGIN:VCALENDAR")
+    yield _ics_fold("VERSION:2.0")
+    yield _ics_fold("PRODID:-//BlueprintX//Study Plan//EN")
+    yield _ics_fold(f"X-WR-CALNAME:{_ics_escape(course)}")
+    for index, (path, leaf) in enumerate(iter_scheduled_leaves(result.get("topics"), date_from, date_to)):
+        day = datetime.strptime(leaf["scheduled_date"], "%Y-%m-%d")
+        uid = leaf.get("id") or f"{analysis['_id']}-{index}"
+        hours = leaf.get("estimated_hours")
+        description = " > ".join(path + (leaf.get("name", ""),))
+        if hours:
+            description += f"\nEstimated hours: {hours:g}"
+        if leaf.get("completed"):
+            description += "\nCompleted"
+        yield _ics_fold("BEGIN:VEVENT")
+        yield _ics_fold(f"UID:{uid}@blueprintx")
+        yield _ics_fold(f"DTSTAMP:{stamp}")
+        yield _ics_fold(f"DTSTART;VALUE=DATE:{day:%Y%m%d}")
+        yield _ics_fold(f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}")
+        yield _ics_fold(f"SUMMARY:{_ics_escape(course + ': ' + leaf.get('name', ''))}")
+        yield _ics_fold(f"DESCRIPTION:{_ics_escape(description)}")
+        yield _ics_fold("END:VEVENT")
+    yield _ics_fold("END:VCALENDAR")
+
+def stream_csv(
+    analysis: Dict[str, Any],
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> Iterator[str]:
+    result = analysis.get("analysis_result") or {}
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def row(values):
+        writer.writerow(values)
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    yield row(["date", "topic", "path", "importance", "estimated_hours", "completed", "topic_id"])
+    for path, leaf in iter_scheduled_leaves(result.get("topics"), date_from, date_to):
+        yield row([
+            leaf["scheduled_date"],
+            leaf.get("name", ""),
+            " > ".join(path),
+            leaf.get("importance", ""),
+            leaf.get("estimated_hours") if leaf.get("estimated_hours") is not None else "",
+            "yes" if leaf.get("completed") else "no",
+            leaf.get("id") or "",
+        ])
@@ -1,21 +1,62 @@
 import io
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Optional
 from fastapi import UploadFile
 import PyPDF2
+from PyPDF2.generic import ArrayObject, BooleanObject, DictionaryObject, IndirectObject, NullObject, StreamObject
 import docx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ImageOnlyPDFError(ValueError):
+    """The PDF has no text layer (scanned pages) and OCR is not available."""
+
+class PageTextCache:
+    """Thread-safe LRU of extracted page text keyed by page fingerprint."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+page_text_cache = PageTextCache(settings.PDF_PAGE_CACHE_SIZE)
 
 async def extract_text_from_file(file: UploadFile) -> str:
     """Extracts text content from uploaded file (PDF or DOCX)."""
-    content_type = file.content_type
     file_bytes = await file.read()
     await file.seek(0) # Reset file pointer if needed elsewhere
 
+    # Parsing is CPU-bound, keep it off the event loop
+    return await asyncio.to_thread(extract_text_from_bytes, file_bytes, file.content_type, file.filename)
+
+def extract_text_from_bytes(file_bytes: bytes, content_type: str, filename: str = None) -> str:
+    """Extracts text content from raw file bytes of the given content type."""
     text_content = ""
 
     try:
         if content_type == "application/pdf":
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-            for page in pdf_reader.pages:
-                text_content += page.extract_text() or ""
+            text_content = _extract_pdf_text(file_bytes, filename)
         elif content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
             doc = docx.Document(io.BytesIO(file_bytes))
             for para in doc.paragraphs:
@@ -30,11 +71,157 @@ async def extract_text_from_file(file: UploadFile) -> str:
             except UnicodeDecodeError:
                  raise ValueError(f"Unsupported file type: {content_type}. Please upload PDF, DOCX, or TXT.")
 
+    except ImageOnlyPDFError:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file.filename}: {e}")
+        print(f"Error extracting text from {filename}: {e}")
         raise ValueError(f"Could not process the uploaded file. Ensure it is a valid PDF, DOCX, or TXT file.") from e
 
     if not text_content.strip():
         raise ValueError("Extracted text content is empty. The file might be empty, corrupted, or image-based.")
 
-    return text_content
\ No newline at end of file
+    return text_content
+
+def _resolve(obj):
+    return obj.get_object() if hasattr(obj, "get_object") else obj
+
+class _Unhashable(Exception):
+    pass
+
+# Resource entries that can't change the extracted text; skipped when hashing
+_IGNORED_RESOURCE_KEYS = {"/ProcSet", "/ColorSpace", "/Pattern", "/Shading", "/ExtGState"}
+
+def _hash_object(obj, memo: dict, depth: int = 0) -> bytes:
+    """
+    Stable digest of a PDF object graph. Streams contribute their decoded data
+    (except images, whose pixels don't affect text), so fonts, embedded font
+    programs and Form XObjects are all covered. Shared indirect objects are
+    hashed once per document via `memo`.
+    """
+    if depth > 32:
+        raise _Unhashable("object graph too deep")
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref not in memo:
+            memo[ref] = None # Cycle guard
+            try:
+                memo[ref] = _hash_object(obj.get_object(), memo, depth + 1)
+            except Exception:
+                del memo[ref] # Don't let a failed object look like a cycle later
+                raise
+        if memo[ref] is None:
+            return f"cycle:{ref}".encode()
+        return memo[ref]
+
+    digest = hashlib.sha256()
+    if isinstance(obj, StreamObject):
+        digest.update(b"stream")
+        if obj.get("/Subtype") != "/Image":
+            digest.update(obj.get_data())
+    if isinstance(obj, DictionaryObject):
+        digest.update(b"dict")
+        for key in sorted(obj.keys()):
+            if key in ("/Length", "/Filter", "/DecodeParms", "/Parent"):
+                continue
+            digest.update(key.encode())
+            digest.update(_hash_object(obj.raw_get(key), memo, depth + 1))
+    elif isinstance(obj, ArrayObject):
+        digest.update(b"array")
+        for item in obj:
+            digest.update(_hash_object(item, memo, depth + 1))
+    elif obj is None or isinstance(obj, (str, bytes, int, Decimal, BooleanObject, NullObject)):
+        digest.update(repr((type(obj).__name__, obj)).encode())
+    else:
+        raise _Unhashable(type(obj).__name__)
+    return digest.digest()
+
+def _page_fingerprint(page, memo: dict) -> Optional[str]:
+    """
+    Hash of everything that determines a page's text: its content stream and
+    its resources, including Form XObjects (recursively), Type0 descendant
+    fonts, encodings, ToUnicode maps and embedded font programs. Returns None
+    (don't cache) if any of it can't be hashed.
+    """
+    try:
+        digest = hashlib.sha256()
+        contents = page.get_contents()
+        digest.update(contents.get_data() if contents is not None else b"")
+        digest.update(repr(page.get("/Rotate", 0)).encode())
+        resources = _resolve(page.get("/Resources")) or DictionaryObject()
+        for key in sorted(resources.keys()):
+            if key in _IGNORED_RESOURCE_KEYS:
+                continue
+            digest.update(key.encode())
+            digest.update(_hash_object(resources.raw_get(key), memo))
+        return digest.hexdigest()
+    except Exception:
+        return None
+
+def _has_images(page) -> bool:
+    try:
+        resources = _resolve(page.get("/Resources")) or {}
+        xobjects = _resolve(resources.get("/XObject")) or {}
+        return any(_resolve(x).get("/Subtype") == "/Image" for x in xobjects.values())
+    except Exception:
+        return False
+
+def _extract_pdf_text(file_bytes: bytes, filename: str = None) -> str:
+    """
+    Extracts PDF text page by page, reusing cached text for pages whose
+    fingerprint was seen before (e.g. re-uploads of an edited syllabus).
+    The first PDF_PROBE_PAGES pages are checked before the full pass, so
+    scanned documents are rejected, or sent to OCR, without parsing every page.
+    """
+    started = time.perf_counter()
+    pages = PyPDF2.PdfReader(io.BytesIO(file_bytes)).pages
+    probe = min(settings.PDF_PROBE_PAGES, len(pages))
+    texts = []
+    cache_hits = 0
+    memo = {}
+
+    for index, page in enumerate(pages):
+        fingerprint = _page_fingerprint(page, memo)
+        text = page_text_cache.get(fingerprint) if fingerprint else None
+        if text is None:
+            text = page.extract_text() or ""
+            if fingerprint:
+                page_text_cache.put(fingerprint, text)
+        else:
+            cache_hits += 1
+        texts.append(text)
+
+        if index + 1 == probe and not any(t.strip() for t in texts):
+            if any(_has_images(pages[i]) for i in range(probe)):
+                if settings.PDF_OCR_ENABLED:
+                    return _ocr_pdf(file_bytes, filename)
+                raise ImageOnlyPDFError(
+                    "This PDF appears to be scanned (image-only) and has no extractable text. "
+                    "Please upload a text-based PDF, DOCX or TXT file."
+                )
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Extracted {len(pages)} PDF pages from {filename} in {elapsed:.3f}s "
+        f"({len(pages) / elapsed if elapsed > 0 else 0:.1f} pages/s, {cache_hits} cached)."
+    )
+    return "".join(texts)
+
+def _ocr_pdf(file_bytes: bytes, filename: str = None) -> str:
+    """Optional local OCR for scanned PDFs; needs pdf2image (poppler) and pytesseract."""
+    try:
+        from pdf2image import convert_from_bytes
+        import pytesseract
+    except ImportError:
+        raise ImageOnlyPDFError(
+            "This PDF appears to be scanned and OCR support is not installed on the server."
+        )
+
+    started = time.perf_counter()
+    images = convert_from_bytes(file_bytes)
+    text_content = "\n".join(pytesseract.image_to_string(image) for image in images)
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"OCR processed {len(images)} pages from {filename} in {elapsed:.3f}s "
+        f"({len(images) / elapsed if elapsed > 0 else 0:.1f} pages/s)."
+    )
+    return text_content
@@ -0,0 +1,83 @@
+import copy
+from typing import Any, List, Dict
+
+# Minimal RFC 6902 (JSON Patch) support: enough to store compact deltas between
+# two revisions of an analysis result and to replay them. Only the "add",
+# "remove" and "replace" operations are produced or understood.
+
+def _escape(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+def make_patch(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Returns the list of operations that turns `old` into `new`."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": copy.deepcopy(value)})
+            else:
+                ops.extend(make_patch(old[key], value, child))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for i in range(common):
+            ops.extend(make_patch(old[i], new[i], f"{path}/{i}"))
+        for i in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": copy.deepcopy(new[i])})
+        # Remove from the end so earlier indices stay valid while replaying
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        return ops
+
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+
+def apply_patch(doc: Any, ops: List[Dict[str, Any]], in_place: bool = False) -> Any:
+    """Applies a patch produced by `make_patch` and returns the resulting document."""
+    if not in_place:
+        doc = copy.deepcopy(doc)
+
+    for op in ops:
+        path = op["path"]
+        if path == "":
+            if op["op"] == "remove":
+                doc = None
+            else:
+                doc = copy.deepcopy(op["value"])
+            continue
+
+        tokens = [_unescape(t) for t in path.split("/")[1:]]
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            elif op["op"] == "replace":
+                parent[index] = copy.deepcopy(op["value"])
+            else:
+                raise ValueError(f"Unsupported patch operation: {op['op']}")
+        else:
+            if op["op"] in ("add", "replace"):
+                parent[last] = copy.deepcopy(op["value"])
+            elif op["op"] == "remove":
+                del parent[last]
+            else:
+                raise ValueError(f"Unsupported patch operation: {op['op']}")
+
+    return doc
@@ -0,0 +1,306 @@
+import re
+from dataclasses import dataclass, field
+from statistics import median
+from typing import List, Dict, Any, Optional
+
+# Rule-based pre-parser that runs before the LLM. It recognises the common
+# shapes of a syllabus outline (unit/module headings, "3.2" numbering, bullet
+# lists, week tables, hour annotations), drops administrative sections such as
+# grading or office hours, and scores how confident it is in the outline found.
+
+KEYWORD_HEADING_RE = re.compile(
+    r"^(unit|module|chapter|part|section|topic|week|lecture|lesson)\s+([0-9]+(?:\.[0-9]+)*|[ivxlc]+)\b[\s:.)\-–—]*(.*)$",
+    re.IGNORECASE,
+)
+NUMBERED_RE = re.compile(r"^(\d{1,2}(?:\.\d{1,2})*)[.)]?\s+(.+)$")
+BULLET_RE = re.compile(r"^[-•*▪◦·]\s+(.+)$")
+MARKDOWN_RE = re.compile(r"^(#{1,6})\s+(.+)$")
+HOURS_RE = re.compile(
+    r"[(\[]?\s*(\d+(?:\.\d+)?)\s*(?:hours?|hrs?|h)\b\.?\s*[)\]]?",
+    re.IGNORECASE,
+)
+TABLE_SPLIT_RE = re.compile(r"\s*\|\s*|\t+|\s{3,}")
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+_DATE = rf"(?:[\d/.\-]+|{_MONTH}\s+{_DAY}(?:,?\s+\d{{4}})?|{_DAY}\s+{_MONTH}(?:,?\s+\d{{4}})?)"
+# Date cells: "05/09", "2024-09-05", "Sep 5", "5 September 2024", "Sep 5 - Sep 9", "Mon"
+DATE_CELL_RE = re.compile(
+    rf"^{_DATE}(?:\s*[-–—]\s*(?:{_DATE}|{_DAY}))?$|^(mon|tue|wed|thu|fri|sat|sun)\w*\b",
+    re.IGNORECASE,
+)
+
+# Administrative sections. A heading is only treated as one when the whole
+# heading is such a label ("Grading", "Office Hours:", "5. Academic Integrity"),
+# so course topics like "Public Policy Evaluation" are kept.
+ADMIN_SECTION_RE = re.compile(
+    r"^(?:course\s+|class\s+)?(?:"
+    r"grading|grades?|grade (?:distribution|breakdown)|marking|assessments?|evaluation"
+    r"|polic(?:y|ies)|attendance|participation|late (?:work|submissions?|assignments?)"
+    r"|office hours|contact|contact (?:information|details)|instructors?|teaching assistants?|tas?"
+    r"|academic (?:integrity|honesty|misconduct)|plagiarism|accommodations?|disability (?:services|accommodations?)"
+    r"|textbooks?|required (?:texts?|textbooks?|materials|readings?)|materials|resources"
+    r"|prerequisites?|learning outcomes?|objectives|communication|important dates|exam schedule"
+    r"|information|logistics"
+    r")(?:\s+(?:policy|policies|information|info|details|breakdown|scheme|criteria|and \w+))?$",
+    re.IGNORECASE,
+)
+# Labels of single administrative lines such as "Instructor: Dr. Smith"
+ADMIN_FIELD_RE = re.compile(
+    r"^(?:instructor|professor|lecturer|teaching assistant|ta|e-?mail|phone|office|office hours"
+    r"|location|room|time|credits?|contact|website|course code)$",
+    re.IGNORECASE,
+)
+
+@dataclass
+class OutlineNode:
+    name: str
+    level: int
+    estimated_hours: Optional[float] = None
+    subtopics: List["OutlineNode"] = field(default_factory=list)
+
+@dataclass
+class ParsedOutline:
+    topics: List[OutlineNode]
+    confidence: float
+    cleaned_text: str
+
+    def leaves(self) -> List[OutlineNode]:
+        found = []
+        def walk(nodes):
+            for node in nodes:
+                if node.subtopics:
+                    walk(node.subtopics)
+                else:
+                    found.append(node)
+        walk(self.topics)
+        return found
+
+    def render(self) -> str:
+        """Compact indented outline, used as a much smaller LLM prompt."""
+        lines = []
+        def walk(nodes, depth):
+            for node in nodes:
+                hours = f" ({node.estimated_hours:g}h)" if node.estimated_hours is not None else ""
+                lines.append("  " * depth + f"- {node.name}{hours}")
+                walk(node.subtopics, depth + 1)
+        walk(self.topics, 0)
+        return "\n".join(lines)
+
+    def to_topic_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Converts the outline into the same raw topic structure the LLM returns.
+        Missing leaf estimates are filled with the median of the annotated ones,
+        and importance is derived from each leaf's share of the hours.
+        """
+        leaves = self.leaves()
+        known = [leaf.estimated_hours for leaf in leaves if leaf.estimated_hours is not None]
+        default_hours = median(known) if known else 2.0
+        ranked = sorted(leaf.estimated_hours if leaf.estimated_hours is not None else default_hours for leaf in leaves)
+        high_cut = ranked[int(len(ranked) * 0.75)] if len(ranked) >= 4 else float("inf")
+        low_cut = ranked[int(len(ranked) * 0.25)] if len(ranked) >= 4 else float("-inf")
+        order = {"Low": 0, "Medium": 1, "High": 2}
+
+        def convert(node):
+            if not node.subtopics:
+                hours = node.estimated_hours if node.estimated_hours is not None else default_hours
+                if hours >= high_cut and hours > low_cut:
+                    importance = "High"
+                elif hours <= low_cut and hours < high_cut:
+                    importance = "Low"
+                else:
+                    importance = "Medium"
+                return {"name": node.name, "importance": importance, "estimated_hours": hours, "subtopics": []}
+            children = [convert(child) for child in node.subtopics]
+            importance = max((c["importance"] for c in children), key=order.get)
+            return {"name": node.name, "importance": importance, "estimated_hours": None, "subtopics": children}
+
+        return [convert(node) for node in self.topics]
+
+def _extract_hours(text: str) -> tuple[str, Optional[float]]:
+    match = HOURS_RE.search(text)
+    if not match:
+        return text, None
+    # Replace with a space so "Sorting 4 hours and searching" keeps its word gap
+    cleaned = _clean_name(text[:match.start()] + " " + text[match.end():])
+    return cleaned, float(match.group(1))
+
+def _clean_name(name: str) -> str:
+    return re.sub(r"\s+", " ", name).strip(" \t:-–—.,;|")
+
+def _is_section_heading(line: str) -> bool:
+    """Lines that start a new section (used to know where a skipped section ends)."""
+    if MARKDOWN_RE.match(line) or KEYWORD_HEADING_RE.match(line):
+        return True
+    words = line.split()
+    if not words or len(words) > 8:
+        return False
+    letters = [c for c in line if c.isalpha()]
+    return line.endswith(":") or (len(letters) > 3 and all(c.isupper() for c in letters))
+
+def _heading_label(line: str) -> str:
+    """Heading text without markdown marks, numbering or trailing punctuation."""
+    if m := MARKDOWN_RE.match(line):
+        line = m.group(2)
+    if m := NUMBERED_RE.match(line):
+        line = m.group(2)
+    return re.sub(r"\s+", " ", line).strip(" \t:-–—.").replace("&", "and")
+
+def _is_admin_heading(line: str) -> bool:
+    return bool(ADMIN_SECTION_RE.match(_heading_label(line)))
+
+def _is_boilerplate_field(line: str) -> bool:
+    """Single administrative lines such as "Instructor: Dr. Smith" or "Grading: 40% exams"."""
+    label, sep, _ = line.partition(":")
+    label = _heading_label(label)
+    return bool(sep) and (bool(ADMIN_FIELD_RE.match(label)) or bool(ADMIN_SECTION_RE.match(label)))
+
+def _parse_week_row(line: str, keyword_match) -> tuple[str, Optional[float]]:
+    """Week tables: take the first cell that is neither the week label, a date nor an hour count."""
+    cells = [c for c in TABLE_SPLIT_RE.split(line) if c.strip()]
+    hours = None
+    name = keyword_match.group(3)
+    if len(cells) > 1:
+        name = ""
+        for cell in cells[1:]:
+            cell_text, cell_hours = _extract_hours(cell)
+            if cell_hours is not None and hours is None:
+                hours = cell_hours
+            if not name and cell_text and not DATE_CELL_RE.match(cell_text):
+                name = cell_text
+    name, inline_hours = _extract_hours(name)
+    return name, hours if hours is not None else inline_hours
+
+def parse_outline(text: str) -> ParsedOutline:
+    """
+    Parses the outline of a syllabus. Shapes it must keep handling (checked
+    with `python -m doctest app/utils/outline_parser.py`):
+
+    >>> print(parse_outline('''Unit 3: Sorting
+    ... Unit 3.1 Bubble sort (2 hours)
+    ... Unit 3.2 Merge sort (3 hours)
+    ... Module 4.1: Graphs - 4 hrs''').render())
+    - Sorting
+      - Bubble sort (2h)
+      - Merge sort (3h)
+    - Module 4
+      - Graphs (4h)
+
+    >>> print(parse_outline('''Week 1 | Sep 5 | Introduction to Python | 3h
+    ... Week 2 | 12 September 2024 | Control flow | 2h
+    ... Week 3 | Sep 19 - Sep 23 | Functions | 4h''').render())
+    - Introduction to Python (3h)
+    - Control flow (2h)
+    - Functions (4h)
+
+    >>> print(parse_outline('''- Sorting 4 hours and searching
+    ... - Trees for 3 hrs with heaps''').render())
+    - Sorting and searching (4h)
+    - Trees for with heaps (3h)
+
+    >>> outline = parse_outline('''PUBLIC POLICY EVALUATION
+    ... - Cost benefit analysis (2h)
+    ... 2.1 Confidence intervals and the 95% rule (3h)
+    ... GRADING
+    ... Midterm 30%
+    ... Office Hours: Mon 3pm''')
+    >>> [leaf.name for leaf in outline.leaves()]
+    ['Cost benefit analysis', 'Confidence intervals and the 95% rule']
+    >>> "Midterm" in outline.cleaned_text
+    False
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    has_keyword_headings = any(KEYWORD_HEADING_RE.match(l) for l in lines if l)
+
+    roots: List[OutlineNode] = []
+    stack: List[OutlineNode] = []
+    kept_lines: List[str] = []
+    structured = prose = removed = 0
+    skipping = False
+    heading_level = 0 # Level of the last non-bullet entry; bullets nest under it
+
+    keyword_nodes: Dict[tuple, OutlineNode] = {} # ("unit", "3") -> node, parents for "Unit 3.2"
+
+    bullet_nodes = set()
+
+    def attach(node: OutlineNode, bullet: bool = False):
+        # Numbered and heading entries never nest under a bullet
+        while stack and (stack[-1].level >= node.level or (not bullet and id(stack[-1]) in bullet_nodes)):
+            stack.pop()
+        if bullet:
+            bullet_nodes.add(id(node))
+        (stack[-1].subtopics if stack else roots).append(node)
+        stack.append(node)
+
+    for line in lines:
+        if not line:
+            continue
+
+        if _is_section_heading(line):
+            # Course units are never administrative, even "Unit 9: Assessment"
+            skipping = not KEYWORD_HEADING_RE.match(line) and _is_admin_heading(line)
+        if skipping or _is_boilerplate_field(line):
+            removed += 1
+            continue
+        kept_lines.append(line)
+
+        level, name, hours, keyword_key = None, None, None, None
+        if m := MARKDOWN_RE.match(line):
+            level = len(m.group(1))
+            name, hours = _extract_hours(m.group(2))
+        elif m := KEYWORD_HEADING_RE.match(line):
+            # "Unit 3" is level 1, "Unit 3.2" level 2, like plain "3.2" numbering
+            level = m.group(2).count(".") + 1
+            keyword_key = (m.group(1).lower(), m.group(2).lower())
+            if m.group(1).lower() == "week":
+                name, hours = _parse_week_row(line, m)
+            else:
+                name, hours = _extract_hours(m.group(3))
+            if not name:
+                name = f"{m.group(1).title()} {m.group(2)}"
+        elif m := NUMBERED_RE.match(line):
+            depth = m.group(1).count(".") + 1
+            level = max(2, depth) if has_keyword_headings else depth
+            name, hours = _extract_hours(m.group(2))
+        elif m := BULLET_RE.match(line):
+            level = heading_level + 1
+            name, hours = _extract_hours(m.group(1))
+
+        name = _clean_name(name or "")
+        if level is None or not name or len(name) > 120:
+            prose += 1
+            continue
+
+        structured += 1
+        if not BULLET_RE.match(line):
+            heading_level = level
+        if keyword_key and level > 1:
+            # "Module 4.1" without a "Module 4" line: add the parent so it doesn't
+            # end up under the previous unit
+            parent_key = (keyword_key[0], keyword_key[1].rsplit(".", 1)[0])
+            if parent_key not in keyword_nodes:
+                parent = OutlineNode(name=f"{parent_key[0].title()} {parent_key[1]}", level=level - 1)
+                attach(parent)
+                keyword_nodes[parent_key] = parent
+        node = OutlineNode(name=name, level=level, estimated_hours=hours)
+        attach(node, bullet=bool(BULLET_RE.match(line)))
+        if keyword_key:
+            keyword_nodes[keyword_key] = node
+
+    outline = ParsedOutline(topics=roots, confidence=0.0, cleaned_text="\n".join(kept_lines))
+    outline.confidence = _score(outline, structured, prose, removed)
+    return outline
+
+def _score(outline: ParsedOutline, structured: int, prose: int, removed: int) -> float:
+    """
+    0..1 estimate of how complete the outline is: the share of lines that
+    were recognised as structure (lines dropped as administrative count
+    against it, in case they held topics) and the share of leaves with an
+    hour annotation, damped for very short outlines.
+    """
+    leaves = outline.leaves()
+    if not leaves:
+        return 0.0
+    structured_ratio = structured / (structured + prose + removed)
+    hours_ratio = sum(1 for leaf in leaves if leaf.estimated_hours is not None) / len(leaves)
+    size_factor = min(1.0, len(leaves) / 5)
+    return round(size_factor * (0.5 * structured_ratio + 0.5 * hours_ratio), 3)
@@ -0,0 +1,156 @@
+import heapq
+import math
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+# Combined study plan across several courses.
+#
+# Each course contributes its unfinished leaf topics in syllabus order (which
+# usually encodes prerequisites). Courses are merged with a heap holding the
+# next leaf of every course, keyed by how late that leaf could start and still
+# leave room for the rest of its course before the exam ("least slack first").
+# Leaves whose latest start falls on the same day are ordered by importance.
+# The merged sequence is then packed into days against one shared daily budget.
+
+DEFAULT_LEAF_HOURS = 0.5 # Same default as the single-course scheduler
+IMPORTANCE_RANK = {"high": 0, "medium": 1, "low": 2}
+
+def flatten_course_leaves(topics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Unfinished leaves of a topic tree, in tree order, as compact plan entries."""
+    leaves = []
+
+    def walk(nodes, done):
+        for node in nodes:
+            completed = done or bool(node.get("completed"))
+            children = node.get("subtopics") or []
+            if children:
+                walk(children, completed)
+            elif not completed:
+                try:
+                    hours = float(node.get("estimated_hours") or DEFAULT_LEAF_HOURS)
+                except (TypeError, ValueError):
+                    hours = DEFAULT_LEAF_HOURS
+                leaves.append({
+                    "topic_id": node.get("id"),
+                    "name": node.get("name", "Unknown"),
+                    "importance": node.get("importance", "Medium"),
+                    "hours": hours,
+                })
+
+    walk(topics, False)
+    return leaves
+
+def _study_days(start: datetime, days_off: List[int]):
+    day = start
+    while True:
+        if day.weekday() not in days_off:
+            yield day
+        day += timedelta(days=1)
+
+def _capacity_until(start: datetime, deadline: datetime, daily_hours: float, days_off: List[int]) -> float:
+    """Study hours available from `start` up to (not including) `deadline`."""
+    total_days = max(0, (deadline.date() - start.date()).days)
+    full_weeks, rest = divmod(total_days, 7)
+    study_days = full_weeks * (7 - len(set(days_off) & set(range(7))))
+    for i in range(rest):
+        if (start + timedelta(days=full_weeks * 7 + i)).weekday() not in days_off:
+            study_days += 1
+    return study_days * daily_hours
+
+def generate_combined_plan(
+    courses: List[Dict[str, Any]],
+    start_date: datetime,
+    daily_hours: float = 2.0,
+    days_off: List[int] = [],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[datetime]]:
+    """
+    Builds one calendar for several courses.
+
+    `courses` items need "analysis_id", "course_name", "leaves" (from
+    flatten_course_leaves) and an optional "exam_date". Returns the scheduled
+    items, a per-course summary and the projected completion date.
+    """
+    if len(set(days_off) & set(range(7))) >= 7:
+        raise ValueError("At least one day per week must be available for studying.")
+
+    total_hours = sum(leaf["hours"] for course in courses for leaf in course["leaves"])
+    capacities = [
+        _capacity_until(start_date, c["exam_date"], daily_hours, days_off) if c.get("exam_date") else None
+        for c in courses
+    ]
+    # Courses without an exam share the horizon needed to finish everything.
+    horizon_hours = max([total_hours] + [c for c in capacities if c is not None])
+    capacities = [horizon_hours if c is None else c for c in capacities]
+
+    heap = []
+    suffix_hours: List[List[float]] = []
+    for idx, course in enumerate(courses):
+        leaves = course["leaves"]
+        suffix = [0.0] * (len(leaves) + 1)
+        for pos in range(len(leaves) - 1, -1, -1):
+            suffix[pos] = suffix[pos + 1] + leaves[pos]["hours"]
+        suffix_hours.append(suffix)
+        if leaves:
+            heapq.heappush(heap, _heap_key(leaves, capacities[idx], idx, 0, suffix, daily_hours))
+
+    order = []
+    while heap:
+        _, _, _, idx, pos = heapq.heappop(heap)
+        order.append((idx, pos))
+        if pos + 1 < len(courses[idx]["leaves"]):
+            heapq.heappush(heap, _heap_key(
+                courses[idx]["leaves"], capacities[idx], idx, pos + 1, suffix_hours[idx], daily_hours
+            ))
+
+    items = []
+    summaries = {idx: {"finish": None, "late_topics": 0} for idx in range(len(courses))}
+    days = _study_days(start_date, days_off)
+    current_day = next(days)
+    filled = 0.0
+    for idx, pos in order:
+        course = courses[idx]
+        leaf = course["leaves"][pos]
+        if filled > 0 and filled + leaf["hours"] > daily_hours:
+            current_day = next(days)
+            filled = 0.0
+        filled += leaf["hours"]
+
+        late = bool(course.get("exam_date")) and current_day.date() >= course["exam_date"].date()
+        items.append({
+            "analysis_id": course["analysis_id"],
+            "course_name": course["course_name"],
+            "topic_id": leaf["topic_id"],
+            "name": leaf["name"],
+            "importance": leaf["importance"],
+            "hours": leaf["hours"],
+            "scheduled_date": current_day.strftime("%Y-%m-%d"),
+            "late": late,
+        })
+        summaries[idx]["finish"] = current_day
+        if late:
+            summaries[idx]["late_topics"] += 1
+
+    course_summaries = []
+    for idx, course in enumerate(courses):
+        finish = summaries[idx]["finish"]
+        course_summaries.append({
+            "analysis_id": course["analysis_id"],
+            "course_name": course["course_name"],
+            "exam_date": course.get("exam_date"),
+            "remaining_topics": len(course["leaves"]),
+            "remaining_hours": round(suffix_hours[idx][0], 2),
+            "projected_completion_date": finish,
+            "late_topics": summaries[idx]["late_topics"],
+            "at_risk": summaries[idx]["late_topics"] > 0,
+        })
+
+    completion_date = max((s["finish"] for s in summaries.values() if s["finish"]), default=None)
+    return items, course_summaries, completion_date
+
+def _heap_key(leaves: List[Dict[str, Any]], capacity: float, idx: int, pos: int, suffix: List[float], daily_hours: float):
+    # Latest point (in study hours from the start) this leaf can begin and still
+    # leave room for the rest of the course before its deadline.
+    latest_start = capacity - suffix[pos]
+    slack_day = math.floor(latest_start / daily_hours) if daily_hours > 0 else 0
+    importance = IMPORTANCE_RANK.get(str(leaves[pos]["importance"]).lower(), 1)
+    return (slack_day, importance, latest_start, idx, pos)
@@ -0,0 +1,72 @@
+"""
+Small load generator for comparing deployment profiles.
+
+    python load_test.py --email test@example.com --password secret --scenario login
+    python load_test.py --token <jwt> --scenario schedule --analysis-id <id>
+
+Reports throughput and latency percentiles; run it once against a single
+worker and once against the production profile to compare.
+"""
+import argparse
+import asyncio
+import time
+import httpx
+
+async def _login(client: httpx.AsyncClient, args) -> httpx.Response:
+    return await client.post("/api/auth/login", data={"username": args.email, "password": args.password})
+
+async def _schedule(client: httpx.AsyncClient, args) -> httpx.Response:
+    return await client.post(
+        f"/api/analysis/{args.analysis_id}/schedule",
+        json={"start_date": time.strftime("%Y-%m-%dT00:00:00"), "daily_hours": 2},
+        headers={"Authorization": f"Bearer {args.token}"},
+    )
+
+async def _health(client: httpx.AsyncClient, args) -> httpx.Response:
+    return await client.get("/health")
+
+SCENARIOS = {"login": _login, "schedule": _schedule, "health": _health}
+
+async def _worker(client, args, deadline, latencies, errors):
+    request = SCENARIOS[args.scenario]
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            response = await request(client, args)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.monotonic() - start)
+
+async def main(args):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            _worker(client, args, deadline, latencies, errors) for _ in range(args.concurrency)
+        ])
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    def pct(p):
+        return 1000 * latencies[int(p * (len(latencies) - 1))] if latencies else 0.0
+    print(f"{args.scenario}: {len(latencies)} requests in {elapsed:.1f}s ({len(latencies) / elapsed:.1f} req/s)")
+    print(f"latency ms  p50={pct(0.5):.1f}  p95={pct(0.95):.1f}  p99={pct(0.99):.1f}")
+    if errors:
+        print(f"errors: {len(errors)} (first: {errors[0]})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="health")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--token")
+    parser.add_argument("--analysis-id")
+    asyncio.run(main(parser.parse_args()))
@@ -1,11 +1,63 @@
+import os
 from pathlib import Path
+from app.core.config import settings
 
 # Configuration for uvicorn
+#
+# Development (default): one auto-reloading worker.
+# Production: set BLUEPRINTX_ENV=production and start with `python uvicorn_config.py`.
+# Several worker processes are started (WEB_CONCURRENCY, default one per CPU core)
+# and SHARED_STATE_BACKEND=mongo is required so rate limits and background-job
+# leases are shared between them.
+ENV = os.getenv("BLUEPRINTX_ENV", "development")
+PRODUCTION = ENV == "production"
+
+host = os.getenv("HOST", "0.0.0.0" if PRODUCTION else "127.0.0.1")
+port = int(os.getenv("PORT", "8000"))
 log_level = "info"
-reload = True
+reload = not PRODUCTION
 
 # Watch the app directory for changes
 reload_dirs = ["app"]
 
 # Exclude the virtual environment directory
 reload_excludes = ["venv", ".git", "__pycache__", "*.pyc"]
+
+# Production settings
+workers = settings.WEB_CONCURRENCY or os.cpu_count() or 1
+# Longer than the Ollama timeout so requests in flight during a deploy can finish
+timeout_graceful_shutdown = settings.GRACEFUL_SHUTDOWN_SECONDS
+timeout_keep_alive = 5
+proxy_headers = True
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+def uvicorn_options() -> dict:
+    options = {"host": host, "port": port, "log_level": log_level}
+    if PRODUCTION:
+        options.update(
+            workers=workers,
+            timeout_graceful_shutdown=timeout_graceful_shutdown,
+            timeout_keep_alive=timeout_keep_alive,
+            proxy_headers=proxy_headers,
+            forwarded_allow_ips=forwarded_allow_ips,
+        )
+    else:
+        options.update(
+            reload=reload,
+            reload_dirs=[str(Path(__file__).parent / d) for d in reload_dirs],
+            reload_excludes=reload_excludes,
+        )
+    return options
+
+if __name__ == "__main__":
+    import uvicorn
+
+    if PRODUCTION:
+        if workers > 1 and settings.SHARED_STATE_BACKEND == "memory":
+            raise SystemExit(
+                f"Refusing to start {workers} workers with SHARED_STATE_BACKEND=memory: "
+                "set SHARED_STATE_BACKEND=mongo, or WEB_CONCURRENCY=1."
+            )
+        # Let the workers see the real count (checked again in app/core/shared_state.py)
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run("app.main:app", **uvicorn_options())
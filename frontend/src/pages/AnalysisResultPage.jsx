@@ -140,11 +140,18 @@ const AnalysisResultPage = () => {
 
         // Save to database
         try {
-            await api.updateAnalysis(id, {
-                filename: analysis.filename,
-                content_hash: analysis.content_hash || 'hash',
-                analysis_result: newResult
-            });
+            if (toggledTopic.id) {
+                const progress = await api.updateTopicProgress(id, toggledTopic.id, !toggledTopic.completed);
+                setAnalysis(prev => ({ ...prev, progress }));
+            } else {
+                // The server assigns topic ids on this save; keep them so later toggles use the PATCH above
+                const saved = await api.updateAnalysis(id, {
+                    filename: analysis.filename,
+                    content_hash: analysis.content_hash || 'hash',
+                    analysis_result: newResult
+                });
+                setAnalysis(saved);
+            }
             console.log("Topic status saved to database");
         } catch (e) {
             console.error("Failed to save topic status:", e);
@@ -120,6 +120,29 @@ export const updateAnalysis = async (id, analysisData) => {
     }
 };
 
+/**
+ * Marks a single topic as completed (or not) without resending the whole analysis.
+ * Returns the updated progress counters.
+ */
+export const updateTopicProgress = async (id, topicId, completed) => {
+    try {
+        const response = await fetch(`${API_BASE_URL}/analysis/${id}/topics/${topicId}`, {
+            method: "PATCH",
+            headers: getHeaders(),
+            body: JSON.stringify({ completed }),
+        });
+
+        if (!response.ok) {
+            throw new Error(`Failed to update topic: ${response.statusText}`);
+        }
+
+        return await response.json();
+    } catch (error) {
+        console.error('Error in updateTopicProgress:', error);
+        throw error;
+    }
+};
+
 /**
  * Generates a study schedule for a saved analysis.
  */